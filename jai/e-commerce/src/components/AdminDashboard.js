@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from "react";
 import axios from "axios";
 import "../styles/Auth.css";
+import { fetchAllProducts } from "../fetchAllProducts";
 
 const BACKEND_URL = "http://127.0.0.1:8000/api";
 
@@ -33,8 +34,7 @@ function AdminDashboard() {
         setLoading(prev => ({...prev, products: true}));
         setError("");
         try {
-            const response = await axios.get(`${BACKEND_URL}/products/`);
-            setProducts(response.data || []);
+            setProducts(await fetchAllProducts(`${BACKEND_URL}/products/`));
         } catch (error) {
             console.error("Error fetching products:", error);
             setError("Failed to fetch products. Please try again.");
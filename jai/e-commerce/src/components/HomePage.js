@@ -1,10 +1,10 @@
 import React, { useEffect, useState } from "react";
-import axios from "axios";
 import Slider from "react-slick";
 import { Link } from "react-router-dom";
 import "slick-carousel/slick/slick.css";
 import "slick-carousel/slick/slick-theme.css";
 import "../styles/HomePage.css";
+import { fetchAllProducts } from "../fetchAllProducts";
 
 const BACKEND_URL = "http://127.0.0.1:8000"; // Change this to your actual backend URL
 
@@ -18,9 +18,8 @@ function HomePage() {
         setLoading(true);
         setError(null);
         try {
-            const response = await axios.get(`${BACKEND_URL}/api/products/`);
-            console.log("Fetched Products:", response.data); // Debugging
-            setProducts(response.data);
+            // Every page of the catalog, not just the first
+            setProducts(await fetchAllProducts(`${BACKEND_URL}/api/products/`));
         } catch (error) {
             console.error("Error fetching products:", error);
             setError("Failed to fetch products. Please try again.");
@@ -7,21 +7,23 @@ const BACKEND_URL = "http://127.0.0.1:8000";
 const SearchResults = () => {
     const location = useLocation();
     const query = new URLSearchParams(location.search).get("q")?.toLowerCase() || "";
-    const [products, setProducts] = useState([]);
     const [filteredProducts, setFilteredProducts] = useState([]);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
         const fetchProducts = async () => {
+            if (!query.trim()) {
+                setFilteredProducts([]);
+                setLoading(false);
+                return;
+            }
+            setLoading(true);
             try {
-                const response = await fetch(`${BACKEND_URL}/api/products/`);
-                const data = await response.json();
-                setProducts(data);
-                setFilteredProducts(
-                    data.filter((product) =>
-                        product.name.toLowerCase().includes(query)
-                    )
-                );
+                // Ranked server-side search over the whole catalog, not just the first page
+                const params = new URLSearchParams({ q: query, limit: "100" });
+                const response = await fetch(`${BACKEND_URL}/api/products/search/?${params}`);
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                setFilteredProducts(await response.json());
             } catch (error) {
                 console.error("Error fetching products:", error);
             } finally {
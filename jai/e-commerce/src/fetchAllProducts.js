@@ -0,0 +1,17 @@
+// The catalog endpoint returns one page at a time (at most 200 products);
+// follow X-Next-Cursor until the last page to get the whole catalog.
+export async function fetchAllProducts(productsUrl, params = {}) {
+    const products = [];
+    let cursor = null;
+    do {
+        const query = new URLSearchParams({ limit: "200", ...params });
+        if (cursor) query.set("cursor", cursor);
+        const response = await fetch(`${productsUrl}?${query}`);
+        if (!response.ok) {
+            throw new Error(`Failed to fetch products (HTTP ${response.status})`);
+        }
+        products.push(...(await response.json()));
+        cursor = response.headers.get("X-Next-Cursor");
+    } while (cursor);
+    return products;
+}
@@ -0,0 +1,29 @@
+import { fetchAllProducts } from "./fetchAllProducts";
+
+const page = (products, nextCursor) => ({
+    ok: true,
+    status: 200,
+    json: async () => products,
+    headers: { get: (name) => (name === "X-Next-Cursor" ? nextCursor : null) },
+});
+
+afterEach(() => {
+    delete global.fetch;
+});
+
+test("follows X-Next-Cursor until the last page", async () => {
+    global.fetch = jest.fn()
+        .mockResolvedValueOnce(page([{ id: 1 }, { id: 2 }], "abc"))
+        .mockResolvedValueOnce(page([{ id: 3 }], null));
+
+    const products = await fetchAllProducts("http://api/products/", { fields: "id,name" });
+
+    expect(products.map((product) => product.id)).toEqual([1, 2, 3]);
+    expect(global.fetch).toHaveBeenNthCalledWith(1, "http://api/products/?limit=200&fields=id%2Cname");
+    expect(global.fetch).toHaveBeenNthCalledWith(2, "http://api/products/?limit=200&fields=id%2Cname&cursor=abc");
+});
+
+test("rejects on an error response", async () => {
+    global.fetch = jest.fn().mockResolvedValue({ ok: false, status: 500 });
+    await expect(fetchAllProducts("http://api/products/")).rejects.toThrow("HTTP 500");
+});
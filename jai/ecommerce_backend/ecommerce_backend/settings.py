@@ -37,6 +37,9 @@ INSTALLED_APPS = [
 
 # 🛡️ MIDDLEWARE
 MIDDLEWARE = [
+    'products.middleware.PerformanceMiddleware',  # Outermost, so it times the whole stack
+    'products.middleware.ASGIURLConfMiddleware',  # ASGI requests get the async catalog views
+    'products.middleware.CompressionMiddleware',  # Before anything that reads or rewrites the body
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -47,8 +50,25 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# 🗜️ RESPONSE COMPRESSION (brotli when the `brotli` package is installed, else gzip)
+RESPONSE_COMPRESSION = {
+    'MIN_SIZE': config('COMPRESSION_MIN_SIZE', default=1024, cast=int),  # Bytes; streamed bodies always qualify
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,  # 0-11; mid levels keep streaming exports cheap on CPU
+    'CONTENT_TYPES': ['application/json', 'text/plain'],  # Not HTML: the browsable API embeds CSRF tokens
+}
+
+# ⚡ ASGI: async catalog views first, then the rest of ROOT_URLCONF
+ASGI_URLCONF = 'products.async_urls'
+
+# 📈 PERFORMANCE METRICS (served at /api/admin/metrics/)
+PERFORMANCE_METRICS = {
+    'N_PLUS_ONE_THRESHOLD': 5,  # Runs of one SQL template in a request that count as N+1
+}
+
 # 🌍 CORS CONFIGURATION
 CORS_ALLOW_ALL_ORIGINS = config("CORS_ALLOW_ALL", default=True, cast=bool)
+CORS_EXPOSE_HEADERS = ['Link', 'X-Next-Cursor']  # Pagination headers on catalog pages
 
 # 🔗 URL CONFIG
 ROOT_URLCONF = 'ecommerce_backend.urls'
@@ -56,20 +76,47 @@ ROOT_URLCONF = 'ecommerce_backend.urls'
 # 🚀 WSGI APPLICATION
 WSGI_APPLICATION = 'ecommerce_backend.wsgi.application'
 
-# 🛢️ DATABASE CONFIG (MySQL)
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': config('DB_NAME', default='ecommerce_db'),
-        'USER': config('DB_USER', default='root'),
-        'PASSWORD': config('DB_PASSWORD', default='Nithish@12'),
-        'HOST': config('DB_HOST', default='localhost'),
-        'PORT': config('DB_PORT', default='3306'),
+# 🛢️ DATABASE CONFIG (MySQL; DB_ENGINE=sqlite for benchmarks and local tests)
+# Test databases are built from the models: the historical migrations do not
+# apply cleanly to an empty database.
+if config('DB_ENGINE', default='mysql') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            # Take the write lock up front so concurrent checkouts queue instead of failing with "database is locked"
+            'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+            'TEST': {'MIGRATE': False},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': config('DB_NAME', default='ecommerce_db'),
+            'USER': config('DB_USER', default='root'),
+            'PASSWORD': config('DB_PASSWORD', default='Nithish@12'),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='3306'),
+            'TEST': {'MIGRATE': False},
+        }
     }
-}
 
 # 🔑 AUTHENTICATION CONFIG
 AUTH_USER_MODEL = 'products.User'
+AUTHENTICATION_BACKENDS = ['products.backends.UsernameOrEmailBackend']  # Username or email, one lookup
+LAST_SEEN_FLUSH_INTERVAL = config('LAST_SEEN_FLUSH_INTERVAL', default=60, cast=int)  # 0 disables tracking
+AUTH_TOKEN_CACHE = {'ALIAS': 'default', 'TIMEOUT': 60}  # Token lookups, shared through CACHES[ALIAS]
+
+# 🧂 PASSWORD HASHING (lower the PBKDF2 work factor only for load tests; 0 = Django's default)
+PASSWORD_HASHERS = [
+    'products.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASHER_ITERATIONS = config('PASSWORD_HASHER_ITERATIONS', default=0, cast=int)
 
 # 🔒 PASSWORD VALIDATORS
 AUTH_PASSWORD_VALIDATORS = [
@@ -91,6 +138,41 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Set SENDFILE_HEADER to 'X-Accel-Redirect' (nginx, internal location at SENDFILE_PREFIX) or
+# 'X-Sendfile' (Apache/lighttpd) to let the front-end server send the bytes
+MEDIA_SERVING = {
+    'MAX_AGE': config('MEDIA_MAX_AGE', default=3600, cast=int),  # Seconds, for names that are not content hashes
+    'HASH_CACHE_ENTRIES': 10000,
+    'SENDFILE_HEADER': config('MEDIA_SENDFILE_HEADER', default=''),
+    'SENDFILE_PREFIX': config('MEDIA_SENDFILE_PREFIX', default='/protected-media/'),
+}
+
+# 🖼️ PRODUCT IMAGE VARIANTS (WebP + JPEG per size; `manage.py generate_image_variants` backfills)
+PRODUCT_IMAGES = {
+    'VARIANTS': {'thumbnail': 160, 'card': 400, 'detail': 1024},  # Longest edge in pixels
+    'WORKERS': config('PRODUCT_IMAGE_WORKERS', default=2, cast=int),  # Render processes
+    'GENERATE_ON_SAVE': True,
+}
+
+# 🧠 SHARED CACHE (point it at Redis or Memcached in production, so every process sees the same entries)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# 🗃️ CATALOG CACHE (entries in a 'local' in-process LRU or in CACHES[ALIAS] with 'django'; versions and ETags always in CACHES[ALIAS])
+CATALOG_CACHE = {
+    'BACKEND': config('CATALOG_CACHE_BACKEND', default='local'),
+    'ALIAS': 'default',
+    'TIMEOUT': config('CATALOG_CACHE_TIMEOUT', default=300, cast=int),
+    'MAX_ENTRIES': 10000,
+}
+
+# 🔎 PRODUCT SEARCH INDEX (snapshot written by `manage.py rebuild_search_index`; empty = build from DB)
+SEARCH_INDEX_PATH = config('SEARCH_INDEX_PATH', default='')
+SEARCH_INDEX_REFRESH = 60  # Seconds between catch-ups with writes from other processes
 
 # 🔧 DEFAULT AUTO FIELD
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -99,8 +181,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # settings.py
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [],  # No global authentication
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'products.authentication.CachedTokenAuthentication',  # Token -> user in the shared cache, batched last_seen
+    ],
     'DEFAULT_PERMISSION_CLASSES': [],      # No global permissions
+    'DEFAULT_RENDERER_CLASSES': [
+        'products.renderers.FastJSONRenderer',  # orjson when installed, same output as JSONRenderer
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 TEMPLATES = [
     {
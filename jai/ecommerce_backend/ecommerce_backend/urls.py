@@ -1,8 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.shortcuts import redirect
 from django.conf import settings
-from django.conf.urls.static import static
+from products.media import serve_media
 
 def redirect_to_api(request):
     return redirect('/api/')
@@ -11,8 +11,6 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('products.urls')),  # Include product API URLs correctly
     path('', redirect_to_api, name='redirect-to-api'),  # Redirect base URL to /api/
+    # Media with ETag/Last-Modified and long-lived caching (offloaded when MEDIA_SERVING['SENDFILE_HEADER'] is set)
+    re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>.*)$", serve_media, name='media'),
 ]
-
-# Serve media files in development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
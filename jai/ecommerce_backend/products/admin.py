@@ -1,7 +1,23 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.db.models import Aggregate, CharField, OuterRef, Subquery, Sum
 from .models import User, Product, Order, OrderItem
 
+
+class GroupConcat(Aggregate):
+    """Comma separated concatenation of a column within each group."""
+    function = 'GROUP_CONCAT'
+    template = "%(function)s(%(expressions)s SEPARATOR ', ')"  # MySQL
+    output_field = CharField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template="%(function)s(%(expressions)s, ', ')", **extra_context)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function='STRING_AGG', template="%(function)s(%(expressions)s::text, ', ')", **extra_context
+        )
+
 # ✅ Register Custom User Model
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):  # ✅ Use Django's UserAdmin for better admin control
@@ -42,14 +58,27 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer', 'get_products', 'get_total_quantity', 'total_price', 'status', 'created_at')
     search_fields = ('customer__username',)
     list_filter = ('status',)
+    readonly_fields = ('total_price',)  # Kept in step by the order items
     inlines = [OrderItemInline]  # Show order items inline in the admin panel
+    list_select_related = ('customer',)
+
+    def get_queryset(self, request):
+        """Annotate item names and quantities so the changelist needs no per-row queries"""
+        # Correlated subqueries rather than a join, so the changelist COUNT stays a plain COUNT(*)
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        return super().get_queryset(request).annotate(
+            product_names=Subquery(items.annotate(names=GroupConcat('product_name')).values('names')),
+            total_quantity=Subquery(items.annotate(quantity=Sum('quantity')).values('quantity')),
+        )
 
     def get_products(self, obj):
-        """Retrieve products from OrderItem"""
-        return ", ".join([item.product_name for item in obj.orderitem_set.all()])
+        """Products in the order, aggregated in the changelist query"""
+        return obj.product_names or ""
     get_products.short_description = "Products"
+    get_products.admin_order_field = 'product_names'
 
     def get_total_quantity(self, obj):
-        """Sum all item quantities"""
-        return sum(item.quantity for item in obj.orderitem_set.all())
+        """Sum of all item quantities, aggregated in the changelist query"""
+        return obj.total_quantity or 0
     get_total_quantity.short_description = "Total Quantity"
+    get_total_quantity.admin_order_field = 'total_quantity'
@@ -0,0 +1,16 @@
+"""
+URLconf for ASGI requests: async catalog views first, then everything else
+from the project URLconf. Selected per request by ``ASGIURLConfMiddleware``.
+"""
+from django.conf import settings
+from django.urls import include, path
+
+from . import async_views
+
+urlpatterns = [
+    path('api/products/', async_views.get_products, name='get_products'),
+    path('api/products/search/', async_views.search_products, name='search_products'),
+    path('api/products/<int:product_id>/', async_views.get_product_by_id, name='get_product_by_id'),
+    path('api/products/category/<str:category>/', async_views.get_products_by_category, name='get_products_by_category'),
+    path('', include(settings.ROOT_URLCONF)),
+]
@@ -0,0 +1,116 @@
+"""
+Native async versions of the read-only catalog views, routed only under ASGI
+(see ``products.async_urls``). Responses match the sync views in
+``products.views``, which keep serving WSGI.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.utils.urls import replace_query_param
+
+from . import search
+from .cache import acategory_key, aget_or_set, aproduct_key, get_catalog_cache
+from .compiled import row_serializer
+from .etags import acategory_etag, acondition, aproduct_etag, aproducts_etag
+from .models import Product
+from .pagination import akeyset_paginate, parse_fields, parse_limit
+from .renderers import dumps
+from .serializers import ProductSerializer
+from .views import CATALOG_ORDERING
+
+
+def _json(data, status=200):
+    # Same bytes as the sync views' renderer
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
+
+
+# ✅ Fetch all products (keyset paginated)
+@require_GET
+@acondition(aproducts_etag)
+async def get_products(request):
+    """Async ``views.get_products``."""
+    try:
+        fields = parse_fields(request.GET.get("fields"), ProductSerializer.Meta.fields)
+        limit = parse_limit(request.GET.get("limit"))
+        rows = row_serializer(ProductSerializer, fields)
+        products = Product.objects.values(*{*rows.columns, *CATALOG_ORDERING})
+        page, next_cursor = await akeyset_paginate(products, CATALOG_ORDERING, request.GET.get("cursor"), limit)
+    except ValueError as e:
+        return _json({"error": str(e)}, status=400)
+
+    response = _json(rows.serialize(page))
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(), "cursor", next_cursor)
+        response["Link"] = f'<{next_url}>; rel="next"'
+        response["X-Next-Cursor"] = next_cursor
+    return response
+
+
+# ✅ Fetch product by ID
+@require_GET
+@acondition(aproduct_etag)
+async def get_product_by_id(request, product_id):
+    """Async ``views.get_product_by_id``."""
+    async def load():
+        return dict(ProductSerializer(await Product.objects.aget(id=product_id)).data)
+
+    try:
+        return _json(await aget_or_set(await aproduct_key(product_id), load))
+    except Product.DoesNotExist:
+        return _json({"detail": "No Product matches the given query."}, status=404)
+
+
+# ✅ Fetch products by category
+@require_GET
+@acondition(acategory_etag)
+async def get_products_by_category(request, category):
+    """Async ``views.get_products_by_category``."""
+    if category not in Product.Category.values:
+        return _json({"error": "No products found in this category"}, status=404)
+
+    async def load():
+        rows = row_serializer(ProductSerializer)
+        products = Product.objects.filter(category=category).order_by(*CATALOG_ORDERING).values(*rows.columns)
+        return rows.serialize([product async for product in products])
+
+    data = await aget_or_set(await acategory_key(category), load)
+    if not data:
+        return _json({"error": "No products found in this category"}, status=404)
+    return _json(data)
+
+
+async def _cached_products(product_ids):
+    cache = get_catalog_cache()
+    keys = {product_id: await aproduct_key(product_id) for product_id in product_ids}
+    found, missing = {}, []
+    for product_id, key in keys.items():
+        data = await cache.aget(key)
+        if data is None:
+            missing.append(product_id)
+        else:
+            found[product_id] = data
+    if missing:
+        async for product in Product.objects.filter(id__in=missing):
+            found[product.id] = dict(ProductSerializer(product).data)
+            await cache.aset(keys[product.id], found[product.id])
+    return [found[product_id] for product_id in product_ids if product_id in found]
+
+
+# ✅ Search products
+@require_GET
+async def search_products(request):
+    """Async ``views.search_products``; the index is never loaded or refreshed on the event loop."""
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return _json({"error": "q is required"}, status=400)
+    try:
+        limit = parse_limit(request.GET.get("limit"), default=20, maximum=100)
+    except ValueError as e:
+        return _json({"error": str(e)}, status=400)
+
+    index = search.get_index()
+    if index is not None:
+        hits = index.search(query, limit)
+    else:
+        hits = await sync_to_async(search.search_database)(query, limit)
+    return _json(await _cached_products([product_id for product_id, _ in hits]))
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import get_token_cache
+
+logger = logging.getLogger(__name__)
+
+
+def _credentials_key(key):
+    return f"auth:credentials:{key}"
+
+
+def forget_token(key):
+    """Drop a token's cached credentials from the shared token cache."""
+    get_token_cache().delete(_credentials_key(key))
+
+
+def forget_user(user_id):
+    """Drop the cached credentials of a user whose record changed."""
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        forget_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    DRF token authentication that caches token -> user and records when each
+    user was last seen.
+
+    Credentials live in the shared token cache (``AUTH_TOKEN_CACHE``) for a
+    short TTL, so warm requests skip the authtoken/user join. Deleting a token
+    (logout) or saving its user evicts the entry for every process sharing the
+    cache; writes that bypass signals (raw SQL, ``QuerySet.update``) apply
+    within the TTL. ``last_seen`` writes are batched, see ``LastSeenBuffer``.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        credentials = cache.get(_credentials_key(key))
+        if credentials is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            credentials = (token.user, token)
+            cache.set(_credentials_key(key), credentials)
+
+        user, token = credentials
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        last_seen.record(user.pk)
+        return credentials
+
+
+class LastSeenBuffer:
+    """
+    Collects "last seen" timestamps in memory and writes them in one UPDATE.
+
+    The first request after ``interval`` seconds hands the write to a
+    background thread, so each process writes at most once per interval
+    however busy it is, and a failed write never fails a request. Timestamps
+    still buffered when a process exits are lost; they are advisory.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    @property
+    def interval(self):
+        return getattr(settings, 'LAST_SEEN_FLUSH_INTERVAL', 60)
+
+    def record(self, user_id):
+        if not self.interval:
+            return
+        with self._lock:
+            self._pending[user_id] = timezone.now()
+            due = time.monotonic() - self._flushed_at >= self.interval
+            if due:
+                self._flushed_at = time.monotonic()  # Later requests in this interval do not schedule again
+        if due:
+            _background.submit(self._flush_in_background)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        if pending:
+            get_user_model().objects.mark_seen(pending)
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not write last-seen timestamps")
+        finally:
+            connections.close_all()  # This thread's connections only
+
+
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='last-seen')
+last_seen = LastSeenBuffer()
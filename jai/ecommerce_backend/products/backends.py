@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+from rest_framework.authtoken.models import Token
+
+from .cache import get_token_cache
+
+UserModel = get_user_model()
+
+
+def resolve_identifier(identifier):
+    """
+    Return the user whose username or email is ``identifier``, in one query.
+
+    A username match wins over an email match; an email shared by several
+    accounts resolves to nobody rather than to an arbitrary one.
+    """
+    username_match, email_matches = None, []
+    for user in UserModel.objects.filter(Q(username=identifier) | Q(email=identifier)):
+        if user.username == identifier:
+            username_match = user
+        else:
+            email_matches.append(user)
+    if username_match is not None:
+        return username_match
+    return email_matches[0] if len(email_matches) == 1 else None
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """Authenticate with a username or an email address and a single password check."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        identifier = username if username is not None else kwargs.get(UserModel.USERNAME_FIELD, kwargs.get('email'))
+        if identifier is None or password is None:
+            return None
+        user = resolve_identifier(identifier)
+        if user is None:
+            # Hash anyway so unknown identifiers take as long as wrong passwords
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def _token_key_key(user_id):
+    return f"auth:token-key:{user_id}"
+
+
+def token_key_for(user):
+    """
+    Return the user's API token key, creating the token on first login.
+
+    Keys are kept in the shared token cache; deleting a token (logout) evicts
+    its entry, so no process hands out a key that no longer authenticates.
+    """
+    cache = get_token_cache()
+    key = cache.get(_token_key_key(user.pk))
+    if key is None:
+        key = Token.objects.get_or_create(user=user)[0].key
+        cache.set(_token_key_key(user.pk), key)
+    return key
+
+
+def forget_token_key(user_id):
+    get_token_cache().delete(_token_key_key(user_id))
@@ -0,0 +1,228 @@
+import json
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from .models import Order, OrderItem, Product, Review, User
+
+BENCH_PASSWORD = "bench-password"
+WORDS = ["phone", "laptop", "tablet", "charger", "case", "cable", "pro", "max", "mini", "ultra",
+         "wireless", "gaming", "slim", "smart", "edition", "black", "silver", "dock", "stand", "lite"]
+
+
+class BenchData:
+    """Ids and credentials of a seeded dataset, for building requests."""
+
+    def __init__(self, product_ids, order_ids, user, user_token, admin, admin_token):
+        self.product_ids = product_ids
+        self.order_ids = order_ids
+        self.user = user
+        self.user_token = user_token
+        self.admin = admin
+        self.admin_token = admin_token
+
+
+def _bulk_create(model, objects, batch_size):
+    created = model.objects.bulk_create(objects, batch_size=batch_size)
+    if created and created[0].pk is None:  # Backends that cannot return ids from bulk inserts
+        created = list(model.objects.order_by('-pk')[:len(created)])[::-1]
+    return created
+
+
+def seed(products=1000, users=100, orders=500, items_per_order=3, reviews=2000, batch_size=1000, rng_seed=0):
+    """
+    Fill the database with a synthetic catalog using bulk inserts only.
+
+    Every user shares one password hash, ratings and order totals are filled
+    in with one UPDATE each, and the same ``rng_seed`` reproduces the same data.
+    """
+    rng = random.Random(rng_seed)
+    password = make_password(BENCH_PASSWORD)
+
+    customers = _bulk_create(User, [
+        User(username=f"bench-user-{i}", email=f"bench-user-{i}@example.com", password=password)
+        for i in range(max(users, 1))
+    ], batch_size)
+    admin = User.objects.create(
+        username="bench-admin", email="bench-admin@example.com", password=password, role=User.Role.ADMIN
+    )
+    user_token = Token.objects.create(user=customers[0])
+    admin_token = Token.objects.create(user=admin)
+
+    catalog = [
+        Product(
+            name=f"{' '.join(rng.sample(WORDS, 3)).title()} {i}",
+            description=' '.join(rng.choice(WORDS) for _ in range(12)),
+            price=Decimal(rng.randrange(500, 300000)) / 100,
+            discount=Decimal(rng.choice([0, 0, 5, 10, 25])),
+            stock=rng.randrange(100, 10000),
+            category=rng.choice(Product.Category.values),
+            is_featured=rng.random() < 0.1,
+        )
+        for i in range(products)
+    ]
+    Product.objects.assign_slugs(catalog)
+    catalog = _bulk_create(Product, catalog, batch_size)
+
+    placed = _bulk_create(Order, [
+        Order(
+            customer=customer,
+            customer_name=customer.username,
+            customer_email=customer.email,
+            status=rng.choice(Order.OrderStatus.values),
+            payment_status=rng.choice(Order.PaymentStatus.values),
+        )
+        for customer in (rng.choice(customers) for _ in range(orders))
+    ], batch_size)
+    items = []
+    for order in placed:
+        for product in rng.sample(catalog, min(items_per_order, len(catalog))):
+            items.append(OrderItem(
+                order=order, product=product, product_name=product.name,
+                quantity=rng.randint(1, 3), price=product.price,
+            ))
+    OrderItem.objects.bulk_create(items, batch_size=batch_size)
+    totals = (
+        OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        .annotate(total=Sum(F('price') * F('quantity'))).values('total')
+    )
+    Order.objects.update(total_price=Coalesce(Subquery(totals), Decimal(0)))
+
+    if catalog:
+        Review.objects.bulk_create([
+            Review(product=rng.choice(catalog), user=rng.choice(customers), rating=rng.randint(1, 5), comment="Bench review")
+            for _ in range(reviews)
+        ], batch_size=batch_size)
+        Product.objects.recount_ratings()
+
+    return BenchData(
+        [product.pk for product in catalog], [order.pk for order in placed],
+        customers[0], user_token.key, admin, admin_token.key,
+    )
+
+
+class Route:
+    """
+    One benchmarked endpoint.
+
+    ``path`` and ``data`` are values or callables taking ``(bench_data, iteration)``,
+    so writes can target a fresh row each time. ``budget`` is the most SQL
+    queries a single request may run, cold caches included.
+    """
+
+    def __init__(self, name, method, path, budget, data=None, auth=None, status=200):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.budget = budget
+        self.data = data
+        self.auth = auth
+        self.status = status
+
+    def request(self, bench_data, iteration):
+        path = self.path(bench_data, iteration) if callable(self.path) else self.path
+        data = self.data(bench_data, iteration) if callable(self.data) else self.data
+        headers = {}
+        if self.auth:
+            headers['HTTP_AUTHORIZATION'] = f"Token {getattr(bench_data, f'{self.auth}_token')}"
+        return path, data, headers
+
+
+def _product(bench_data, i):
+    return bench_data.product_ids[i % len(bench_data.product_ids)]
+
+
+def _order(bench_data, i):
+    return bench_data.order_ids[i % len(bench_data.order_ids)]
+
+
+def _doomed_product(bench_data, i):
+    return bench_data.product_ids[-1 - i]  # Deleted from the far end of the catalog
+
+
+# Every route in products/urls.py
+ROUTES = [
+    Route("api_root", "get", "/api/", 0),
+    Route("get_products", "get", "/api/products/", 1),
+    Route("get_products ?fields&limit", "get", "/api/products/?fields=id,name,price&limit=200", 1),
+    Route("search_products", "get", lambda d, i: f"/api/products/search/?q={WORDS[i % len(WORDS)]}", 2),
+    Route("filter_products", "get", "/api/products/filter/?category=phone,laptop&min_price=50&sort=-discounted_price", 2),
+    Route("get_product_by_id", "get", lambda d, i: f"/api/products/{_product(d, i)}/", 1),
+    Route("product_reviews", "get", lambda d, i: f"/api/products/{_product(d, i)}/reviews/", 2),
+    Route("product_reviews (post)", "post", lambda d, i: f"/api/products/{_product(d, i)}/reviews/", 6,
+          data={"rating": 4, "comment": "Fine"}, auth="user", status=201),
+    Route("get_products_by_category", "get", lambda d, i: f"/api/products/category/{Product.Category.values[i % 4]}/", 1),
+    Route("register", "post", "/api/auth/register/", 3,
+          data=lambda d, i: {"username": f"bench-new-{i}", "email": f"bench-new-{i}@example.com", "password": BENCH_PASSWORD},
+          status=201),
+    Route("login", "post", "/api/auth/login/", 10, data={"identifier": "bench-user-0", "password": BENCH_PASSWORD}),
+    Route("logout", "post", "/api/auth/logout/", 2),
+    Route("admin_login", "post", "/api/admin/login/", 10, data={"username": "bench-admin", "password": BENCH_PASSWORD}),
+    Route("add_product", "post", "/api/admin/products/add/", 5,
+          data=lambda d, i: {"name": f"Bench added {i}", "description": "Added", "price": "19.99", "category": "phone"},
+          status=201),
+    Route("update_product", "put", lambda d, i: f"/api/admin/products/update/{_product(d, i)}/", 4,
+          data=lambda d, i: {"price": f"{20 + i % 50}.00"}),
+    Route("delete_product", "delete", lambda d, i: f"/api/admin/products/delete/{_doomed_product(d, i)}/", 6,
+          status=204),
+    Route("create_order", "post", "/api/orders/create/", 8,
+          data=lambda d, i: {"items": [{"id": _product(d, i + k), "quantity": 1} for k in range(5)]},
+          status=201),
+    Route("get_orders", "get", "/api/admin/orders/", 3),
+    Route("get_orders ?status", "get", "/api/admin/orders/?status=Pending", 3),
+    # Exports run one query per 1,000 rows (two for orders, to fetch items), plus a final empty batch;
+    # these budgets fit the benchmark's default volumes
+    Route("export_products", "get", "/api/products/export/?fields=id,name,price", 3),
+    Route("export_orders", "get", "/api/admin/orders/export/", 4, auth="admin"),
+    Route("update_order_status", "put", lambda d, i: f"/api/admin/orders/update/{_order(d, i)}/", 2,
+          data={"status": "Shipped"}),
+    Route("metrics", "get", "/api/admin/metrics/", 1, auth="admin"),
+]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_route(client, route, bench_data, iterations):
+    """Call ``route`` ``iterations`` times and summarise latency and query counts."""
+    timings, queries, statuses = [], [], set()
+    started = time.perf_counter()
+    for i in range(iterations):
+        path, data, headers = route.request(bench_data, i)
+        kwargs = {'data': json.dumps(data), 'content_type': 'application/json'} if data is not None else {}
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = getattr(client, route.method)(path, **kwargs, **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)  # The queries run as the body is sent
+            timings.append(time.perf_counter() - start)
+        queries.append(len(captured))
+        statuses.add(response.status_code)
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        'name': route.name,
+        'method': route.method.upper(),
+        'iterations': iterations,
+        'statuses': sorted(statuses),
+        'expected_status': route.status,
+        'throughput_rps': round(iterations / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3) if timings else 0.0,
+        'max_queries': max(queries, default=0),
+        'query_budget': route.budget,
+        'within_budget': max(queries, default=0) <= route.budget,
+    }
@@ -0,0 +1,260 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+_MISSING = object()
+
+
+class LocalLRUCache:
+    """Thread-safe, in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries=10000, timeout=300):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=_MISSING):
+        timeout = self.timeout if timeout is _MISSING else timeout
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    # In-memory and lock-protected, so safe to call straight from the event loop
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aset(self, key, value, timeout=_MISSING):
+        self.set(key, value, timeout)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCache:
+    """Adapter exposing a configured Django cache alias with the same interface."""
+
+    def __init__(self, alias='default', timeout=300):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def get(self, key, default=None):
+        return self._cache.get(key, default)
+
+    def set(self, key, value, timeout=_MISSING):
+        self._cache.set(key, value, self.timeout if timeout is _MISSING else timeout)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    async def aget(self, key, default=None):
+        return await self._cache.aget(key, default)
+
+    async def aset(self, key, value, timeout=_MISSING):
+        await self._cache.aset(key, value, self.timeout if timeout is _MISSING else timeout)
+
+    def clear(self):
+        self._cache.clear()
+
+
+def build_cache(options):
+    """Create a cache from a settings dict (``BACKEND`` is ``'local'`` or ``'django'``)."""
+    backend = options.get('BACKEND', 'local')
+    timeout = options.get('TIMEOUT', 300)
+    if backend == 'local':
+        return LocalLRUCache(max_entries=options.get('MAX_ENTRIES', 10000), timeout=timeout)
+    if backend == 'django':
+        return DjangoCache(alias=options.get('ALIAS', 'default'), timeout=timeout)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+_catalog_cache = None
+_catalog_cache_lock = threading.Lock()
+
+
+def get_catalog_cache():
+    """Return the process-wide catalog cache configured by ``settings.CATALOG_CACHE``."""
+    global _catalog_cache
+    if _catalog_cache is None:
+        with _catalog_cache_lock:
+            if _catalog_cache is None:
+                _catalog_cache = build_cache(getattr(settings, 'CATALOG_CACHE', {}))
+    return _catalog_cache
+
+
+def get_token_cache():
+    """Return the shared cache for token lookups configured by ``settings.AUTH_TOKEN_CACHE``."""
+    options = getattr(settings, 'AUTH_TOKEN_CACHE', {})
+    return DjangoCache(alias=options.get('ALIAS', 'default'), timeout=options.get('TIMEOUT', 60))
+
+
+def get_or_set(key, loader, timeout=_MISSING):
+    """Read-through helper: return the cached value or store ``loader()``."""
+    cache = get_catalog_cache()
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = loader()
+        cache.set(key, value, timeout)
+    return value
+
+
+async def aget_or_set(key, loader, timeout=_MISSING):
+    """Async ``get_or_set``; ``loader`` is an async callable."""
+    cache = get_catalog_cache()
+    value = await cache.aget(key, _MISSING)
+    if value is _MISSING:
+        value = await loader()
+        await cache.aset(key, value, timeout)
+    return value
+
+
+# Keys ----------------------------------------------------------------------
+#
+# Product and category entries are keyed by a version that every write bumps
+# (after commit) instead of deleting the entry. A reader that loaded the old
+# row before the bump stores it under the retired version, where nobody looks.
+# The versions also make the catalog ETags (see ``products.etags``), so they
+# live in the shared Django cache even when the entries themselves are local:
+# a write in one process retires entries and tags in all of them.
+
+def order_count_key(filters):
+    digest = hashlib.md5(repr(sorted(filters.items())).encode()).hexdigest()
+    return f"orders:count:{digest}"
+
+
+_CATALOG_VERSION_KEY = "catalog:version:all"
+
+
+def _product_version_key(product_id):
+    return f"catalog:version:product:{product_id}"
+
+
+def _category_version_key(category):
+    return f"catalog:version:category:{category}"
+
+
+def _version_cache():
+    """
+    Where versions are kept: ``CATALOG_CACHE['ALIAS']`` of the Django caches.
+
+    Versions expire with the entries, so processes that do not share that
+    cache still pick up other processes' writes within ``TIMEOUT``.
+    """
+    options = getattr(settings, 'CATALOG_CACHE', {})
+    return DjangoCache(alias=options.get('ALIAS', 'default'), timeout=options.get('TIMEOUT', 300))
+
+
+def _version(key):
+    """
+    Current value of the version counter at ``key``.
+
+    Versions start from a timestamp rather than 1, so a counter that was evicted
+    and re-created can never collide with a version still present in old keys.
+    """
+    cache = _version_cache()
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version)
+    return version
+
+
+async def _aversion(key):
+    cache = _version_cache()
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        await cache.aset(key, version)
+    return version
+
+
+def catalog_version():
+    """Current version of the whole catalog; any product write bumps it."""
+    return _version(_CATALOG_VERSION_KEY)
+
+
+async def acatalog_version():
+    return await _aversion(_CATALOG_VERSION_KEY)
+
+
+def product_version(product_id):
+    """Current version of one product."""
+    return _version(_product_version_key(product_id))
+
+
+async def aproduct_version(product_id):
+    return await _aversion(_product_version_key(product_id))
+
+
+def category_version(category):
+    """Current version of a category listing."""
+    return _version(_category_version_key(category))
+
+
+async def acategory_version(category):
+    return await _aversion(_category_version_key(category))
+
+
+def product_key(product_id):
+    return f"catalog:product:{product_id}:v{product_version(product_id)}"
+
+
+async def aproduct_key(product_id):
+    return f"catalog:product:{product_id}:v{await aproduct_version(product_id)}"
+
+
+def category_key(category):
+    return f"catalog:category:{category}:v{category_version(category)}"
+
+
+async def acategory_key(category):
+    return f"catalog:category:{category}:v{await acategory_version(category)}"
+
+
+# Invalidation --------------------------------------------------------------
+
+def _bump(key):
+    cache = _version_cache()
+    cache.set(key, max(cache.get(key) or 0, time.time_ns()) + 1)
+
+
+def bump_category_version(category):
+    _bump(_category_version_key(category))
+
+
+def invalidate_product(product_id, categories=()):
+    """Retire a product's detail entry, the listings it appeared in and the catalog's version."""
+    _bump(_CATALOG_VERSION_KEY)
+    if product_id is not None:
+        _bump(_product_version_key(product_id))
+    for category in set(categories):
+        if category:
+            bump_category_version(category)
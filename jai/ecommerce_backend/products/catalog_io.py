@@ -0,0 +1,97 @@
+import csv
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+
+from .models import Product
+
+# Columns accepted on import and written on export, in file order
+PRODUCT_IO_FIELDS = ['name', 'slug', 'description', 'price', 'discount', 'stock', 'category', 'image', 'is_featured']
+REQUIRED_FIELDS = {'name', 'description', 'price'}
+BOOLEAN_STRINGS = {'true': True, 't': True, 'yes': True, 'y': True, '1': True,
+                   'false': False, 'f': False, 'no': False, 'n': False, '0': False}
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise ValueError("Cannot infer the format from the file name; pass --format csv or --format jsonl")
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, dict)`` pairs from a CSV or JSONL stream, one at a time."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, ValueError(f"Invalid JSON: {e}")
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def clean_row(row):
+    """
+    Validate one input row with the model fields' own validation.
+
+    Returns ``(values, present)`` where ``present`` lists the columns the row
+    supplied. Blank CSV cells count as absent. Raises ``ValidationError``.
+    """
+    if isinstance(row, Exception):
+        raise ValidationError(str(row))
+
+    values, present, errors = {}, [], {}
+    for name in PRODUCT_IO_FIELDS:
+        raw = row.get(name)
+        if raw is None or raw == '':
+            if name in REQUIRED_FIELDS:
+                errors[name] = ["This field is required."]
+            continue
+        field = Product._meta.get_field(name)
+        if isinstance(raw, float):
+            raw = repr(raw)  # JSON numbers: avoid binary float noise in DecimalFields
+        if isinstance(raw, str) and field.get_internal_type() == 'BooleanField':
+            raw = BOOLEAN_STRINGS.get(raw.strip().lower(), raw)
+        try:
+            values[name] = field.clean(raw, None)
+            present.append(name)
+        except ValidationError as e:
+            errors[name] = e.messages
+    if errors:
+        raise ValidationError(errors)
+    return values, present
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class RowWriter:
+    """Writes product rows as CSV or JSONL."""
+
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(stream, fieldnames=PRODUCT_IO_FIELDS)
+            self._csv.writeheader()
+        elif fmt != 'jsonl':
+            raise ValueError(f"Unsupported format: {fmt}")
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self._csv.writerow(row)
+        else:
+            self.stream.write(json.dumps({key: _plain(value) for key, value in row.items()}) + "\n")
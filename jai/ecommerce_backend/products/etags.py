@@ -0,0 +1,103 @@
+"""
+Weak ETags for the catalog endpoints, made from the catalog cache's version
+counters (see ``products.cache``) without touching the database, so an
+unchanged catalog is answered with a 304 before anything is loaded.
+
+Every write that changes serialized product data bumps the versions once it
+has committed (saves, deletes, rating updates, image variants, imports), and
+the cached bodies are keyed by the same versions. Tags are read before the
+body, so a response never carries a tag newer than its body. The query string
+and the serializer's fields are part of the tag, so each page, projection and
+API shape gets its own.
+
+Only 200 responses are tagged: a 404 or 400 must never be revalidated into a 304.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+
+from .cache import (
+    acatalog_version, acategory_version, aproduct_version, catalog_version, category_version, product_version,
+)
+from .models import Product
+from .serializers import ProductSerializer
+
+
+def _tag(version, request):
+    params = sorted((key, sorted(values)) for key, values in request.GET.lists())
+    raw = f"{version}|{params}|{ProductSerializer.Meta.fields}"
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+# Signatures match the views
+
+def products_etag(request):
+    return _tag(catalog_version(), request)
+
+
+def product_etag(request, product_id):
+    return _tag(product_version(product_id), request)
+
+
+def category_etag(request, category):
+    if category not in Product.Category.values:
+        return None
+    return _tag(category_version(category), request)
+
+
+async def aproducts_etag(request):
+    return _tag(await acatalog_version(), request)
+
+
+async def aproduct_etag(request, product_id):
+    return _tag(await aproduct_version(product_id), request)
+
+
+async def acategory_etag(request, category):
+    if category not in Product.Category.values:
+        return None
+    return _tag(await acategory_version(category), request)
+
+
+# Decorators -----------------------------------------------------------------
+
+def _not_modified(request, etag):
+    response = get_conditional_response(request, etag=etag) if etag else None
+    if response is not None and response.status_code == 304:
+        response['ETag'] = etag  # A 304 must repeat the validator it matched
+    return response
+
+
+def _tagged(response, etag):
+    if etag and response.status_code == 200 and not response.has_header('ETag'):
+        response['ETag'] = etag
+    return response
+
+
+def condition(etag_func):
+    """``django.views.decorators.http.condition`` for ETags that tags only 200 responses."""
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            etag = etag_func(request, *args, **kwargs)
+            not_modified = _not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+            return _tagged(view(request, *args, **kwargs), etag)
+        return inner
+    return decorator
+
+
+def acondition(etag_func):
+    """Async ``condition``; ``etag_func`` and the view are awaited."""
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag = await etag_func(request, *args, **kwargs)
+            not_modified = _not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+            return _tagged(await view(request, *args, **kwargs), etag)
+        return inner
+    return decorator
@@ -0,0 +1,109 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .models import Product
+
+# Upper bounds are exclusive; None means open-ended
+DEFAULT_PRICE_BUCKETS = [(0, 100), (100, 500), (500, 1000), (1000, 2000), (2000, None)]
+
+# Keyset orderings for each `sort` value; each ends in `id` so positions are unique
+CATALOG_SORTS = {
+    'newest': ('-created_at', '-id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'discounted_price': ('discounted_price', 'id'),
+    '-discounted_price': ('-discounted_price', '-id'),
+}
+
+TRUE_VALUES = {'1', 'true', 'yes'}
+
+
+def price_buckets():
+    return getattr(settings, 'CATALOG_PRICE_BUCKETS', DEFAULT_PRICE_BUCKETS)
+
+
+def _decimal(params, name):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        raise ValueError(f"{name} must be a number")
+    if not value.is_finite():  # NaN and Infinity parse, but no lookup accepts them
+        raise ValueError(f"{name} must be a number")
+    return value
+
+
+def _bucket_q(low, high):
+    condition = Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+class CatalogFilter:
+    """
+    Parsed catalog filter parameters.
+
+    Filters are split by facet so each facet's counts can ignore its own
+    selection (picking "phone" still shows how many laptops match the rest).
+    """
+
+    def __init__(self, params):
+        categories = [value for raw in params.getlist('category') for value in raw.split(',') if value]
+        unknown = [category for category in categories if category not in Product.Category.values]
+        if unknown:
+            raise ValueError(f"Unknown categories: {', '.join(unknown)}")
+
+        min_price, max_price = _decimal(params, 'min_price'), _decimal(params, 'max_price')
+        min_discount = _decimal(params, 'min_discount')
+
+        self.sort = params.get('sort') or 'newest'
+        if self.sort not in CATALOG_SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(CATALOG_SORTS)}")
+
+        self.category_q = Q(category__in=categories) if categories else Q()
+        self.price_q = Q()
+        if min_price is not None:
+            self.price_q &= Q(price__gte=min_price)
+        if max_price is not None:
+            self.price_q &= Q(price__lte=max_price)
+
+        self.other_q = Q()
+        if min_discount is not None:
+            self.other_q &= Q(discount__gte=min_discount)
+        if params.get('featured', '').lower() in TRUE_VALUES:
+            self.other_q &= Q(is_featured=True)
+        if params.get('in_stock', '').lower() in TRUE_VALUES:
+            self.other_q &= Q(stock__gt=0)
+
+    @property
+    def ordering(self):
+        return CATALOG_SORTS[self.sort]
+
+    def queryset(self):
+        """Products matching every filter."""
+        return Product.objects.filter(self.other_q & self.category_q & self.price_q)
+
+    def facet_counts(self):
+        """Category and price bucket counts, all from a single aggregate query."""
+        buckets = price_buckets()
+        aggregates = {
+            f'category_{category}': Count('id', filter=Q(category=category) & self.price_q)
+            for category in Product.Category.values
+        }
+        aggregates.update({
+            f'price_{i}': Count('id', filter=_bucket_q(low, high) & self.category_q)
+            for i, (low, high) in enumerate(buckets)
+        })
+        counts = Product.objects.filter(self.other_q).aggregate(**aggregates)
+        return {
+            'category': {category: counts[f'category_{category}'] for category in Product.Category.values},
+            'price': [
+                {'min': low, 'max': high, 'count': counts[f'price_{i}']}
+                for i, (low, high) in enumerate(buckets)
+            ],
+        }
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, must_update_salt
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with its work factor taken from ``PASSWORD_HASHER_ITERATIONS``.
+
+    Keeps the ``pbkdf2_sha256`` algorithm name, so existing hashes still verify.
+    Logins only ever re-encode hashes upwards: a lowered setting leaves stronger
+    stored hashes alone, and hashes made while it was lowered are upgraded once
+    it is raised again. Lower it only for load testing; ``0`` keeps Django's
+    default.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASHER_ITERATIONS', 0) or PBKDF2PasswordHasher.iterations
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return decoded['iterations'] < self.iterations or must_update_salt(decoded['salt'], self.salt_entropy)
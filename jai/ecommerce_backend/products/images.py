@@ -0,0 +1,183 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; images are never upscaled
+DEFAULT_VARIANTS = {'thumbnail': 160, 'card': 400, 'detail': 1024}
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+VARIANT_DIR = 'variants'
+
+
+def _options():
+    return getattr(settings, 'PRODUCT_IMAGES', {})
+
+
+def variant_sizes():
+    return _options().get('VARIANTS', DEFAULT_VARIANTS)
+
+
+# Rendering (runs in worker processes; keep it free of Django model imports) --
+
+def render_variants(source, sizes):
+    """
+    Resize and recompress image bytes into every size and format.
+
+    Returns ``{variant: {'width', 'height', fmt: bytes, ...}}``.
+    """
+    with Image.open(io.BytesIO(source)) as image:
+        image.draft('RGB', (max(sizes.values()),) * 2)  # Let JPEG decode at a reduced scale
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            flattened = Image.new('RGB', image.size, 'white')  # JPEG has no alpha
+            flattened.paste(image, mask=image.getchannel('A'))
+            image = flattened
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        rendered = {}
+        for variant, edge in sizes.items():
+            resized = image.copy()
+            resized.thumbnail((edge, edge), Image.LANCZOS)
+            outputs = {'width': resized.width, 'height': resized.height}
+            for fmt, (pil_format, _, save_options) in FORMATS.items():
+                buffer = io.BytesIO()
+                resized.save(buffer, pil_format, **save_options)
+                outputs[fmt] = buffer.getvalue()
+            rendered[variant] = outputs
+        return rendered
+
+
+_process_pool = None
+_pool_lock = threading.Lock()
+
+
+def process_pool():
+    """Shared pool for rendering; spawned so workers never inherit Django state or threads."""
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=_options().get('WORKERS'), mp_context=multiprocessing.get_context('spawn')
+            )
+        return _process_pool
+
+
+# Storage ------------------------------------------------------------------
+
+def store_variant(storage, data, extension):
+    """Save bytes under a name derived from their SHA-256; identical output is stored once."""
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{VARIANT_DIR}/{digest[:2]}/{digest}.{extension}"
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(data))
+    return name
+
+
+def store_rendered(storage, source_name, rendered):
+    """Store rendered variants and return the ``Product.image_variants`` value."""
+    variants = {'source': source_name}
+    for variant, outputs in rendered.items():
+        stored = {'width': outputs['width'], 'height': outputs['height']}
+        for fmt, (_, extension, _) in FORMATS.items():
+            stored[fmt] = store_variant(storage, outputs[fmt], extension)
+        variants[variant] = stored
+    return variants
+
+
+def needs_variants(product):
+    return bool(product.image) and product.image_variants.get('source') != product.image.name
+
+
+def read_source(product):
+    """The product's image bytes, or ``None`` when the file is missing."""
+    storage = product.image.storage
+    if not storage.exists(product.image.name):
+        return None
+    with storage.open(product.image.name, 'rb') as f:
+        return f.read()
+
+
+def save_variants(products, results):
+    """Write ``{product_id: variants}`` back and evict the cached catalog entries."""
+    from .cache import invalidate_product
+    from .models import Product
+
+    now = timezone.now()
+    for product in products:
+        if product.pk in results:
+            # Matching on the image skips products whose image was replaced meanwhile
+            Product.objects.filter(pk=product.pk, image=product.image.name).update(
+                image_variants=results[product.pk], updated_at=now,
+            )
+            transaction.on_commit(lambda product=product: invalidate_product(product.pk, [product.category]))
+
+
+def generate_variants(products, pool=None):
+    """
+    Render and store variants for ``products`` (instances with ``image``,
+    ``image_variants`` and ``category`` loaded), rendering in ``pool``.
+
+    Returns the number of products updated. Unreadable images are logged and skipped.
+    """
+    pool = pool or process_pool()
+    sizes = variant_sizes()
+    pending = {}
+    for product in products:
+        source = read_source(product)
+        if source is None:
+            logger.warning("Image %s of product %s is missing; no variants made", product.image.name, product.pk)
+            continue
+        pending[product.pk] = (product, pool.submit(render_variants, source, sizes))
+
+    results = {}
+    for product_id, (product, future) in pending.items():
+        try:
+            rendered = future.result()
+        except Exception:
+            logger.exception("Could not render variants of %s for product %s", product.image.name, product_id)
+            continue
+        results[product_id] = store_rendered(product.image.storage, product.image.name, rendered)
+    save_variants(products, results)
+    return len(results)
+
+
+# On save ------------------------------------------------------------------
+
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='product-images')
+
+
+def _generate_in_background(product_id):
+    from .models import Product
+
+    try:
+        product = Product.objects.only('id', 'image', 'image_variants', 'category').filter(pk=product_id).first()
+        if product is not None and needs_variants(product):
+            generate_variants([product])
+    except Exception:
+        logger.exception("Image variants for product %s failed", product_id)
+    finally:
+        connections.close_all()  # This thread's connections only
+
+
+def schedule_variants(product):
+    """Generate variants off the request thread once the save has committed."""
+    if not (_options().get('GENERATE_ON_SAVE', True) and needs_variants(product)):
+        return
+    if product.image.storage.exists(product.image.name):
+        product_id = product.pk
+        transaction.on_commit(lambda: _background.submit(_generate_in_background, product_id))
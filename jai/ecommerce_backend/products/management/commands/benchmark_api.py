@@ -0,0 +1,111 @@
+import json
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from products import bench
+from products.cache import get_catalog_cache
+from products.search import reset_index
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and benchmark every products API route: throughput, "
+        "p50/p99 latency and SQL queries per request, checked against per-route query budgets. "
+        "Run with DB_ENGINE=sqlite for the reference numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--items-per-order', type=int, default=3)
+        parser.add_argument('--reviews', type=int, default=5000)
+        parser.add_argument('--iterations', type=int, default=50, help="Requests per route.")
+        parser.add_argument('--route', action='append', dest='routes', help="Only run routes with this name (repeatable).")
+        parser.add_argument('--hasher-iterations', type=int, default=1000,
+                            help="PBKDF2 work factor during the run, so login timings are not all hashing. 0 = production setting.")
+        parser.add_argument('--output', help="Write the results as JSON to this file ('-' for stdout).")
+
+    def handle(self, *args, **options):
+        routes = bench.ROUTES
+        if options['routes']:
+            routes = [route for route in routes if route.name in options['routes']]
+            if not routes:
+                raise CommandError(f"No routes named {', '.join(options['routes'])}")
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1")
+        volumes = {name: options[name] for name in ('products', 'users', 'orders', 'items_per_order', 'reviews')}
+        if options['products'] < options['iterations']:
+            raise CommandError("--products must be at least --iterations (deletes need a fresh product each time)")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        hasher = {'PASSWORD_HASHER_ITERATIONS': options['hasher_iterations']} if options['hasher_iterations'] else {}
+        try:
+            with override_settings(**hasher):
+                started = time.perf_counter()
+                bench_data = bench.seed(**volumes)
+                seed_seconds = time.perf_counter() - started
+                self.stdout.write(f"Seeded {connection.vendor} test database in {seed_seconds:.1f}s")
+
+                get_catalog_cache().clear()
+                reset_index()
+                client = Client()
+                results = []
+                for route in routes:
+                    result = bench.run_route(client, route, bench_data, options['iterations'])
+                    results.append(result)
+                    self._report(result)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'commit': _git_commit(),
+            'database': connection.vendor,
+            'python': sys.version.split()[0],
+            'volumes': volumes,
+            'iterations': options['iterations'],
+            'seed_seconds': round(seed_seconds, 3),
+            'routes': results,
+        }
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        over = [result['name'] for result in results if not result['within_budget']]
+        unexpected = [result['name'] for result in results if result['statuses'] != [result['expected_status']]]
+        if unexpected:
+            raise CommandError(f"Unexpected status codes from: {', '.join(unexpected)}")
+        if over:
+            raise CommandError(f"Over query budget: {', '.join(over)}")
+
+    def _report(self, result):
+        line = (
+            f"{result['name']:<28} {result['throughput_rps']:>9} req/s  "
+            f"p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  "
+            f"queries {result['max_queries']}/{result['query_budget']}"
+        )
+        if result['within_budget'] and result['statuses'] == [result['expected_status']]:
+            self.stdout.write(self.style.SUCCESS(line))
+        else:
+            self.stdout.write(self.style.ERROR(f"{line}  status {result['statuses']}"))
@@ -0,0 +1,80 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from products.models import Order, Product
+from products.pagination import DEFAULT_PAGE_SIZE, keyset_filter
+from products.views import CATALOG_ORDERING, ORDER_FEED_ORDERING
+
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (TABLE )?(?P<table>\w+)$")
+POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (?P<table>\w+)")
+
+
+def hot_queries():
+    """Yield ``(label, queryset)`` for the queries behind the busiest views."""
+    page = DEFAULT_PAGE_SIZE + 1
+    now = timezone.now()
+
+    products = Product.objects.values('id', 'name', 'price', 'created_at')
+    yield "get_products", products.order_by(*CATALOG_ORDERING)[:page]
+    yield "get_products (cursor)", products.filter(keyset_filter(CATALOG_ORDERING, [now, 1])).order_by(*CATALOG_ORDERING)[:page]
+    yield "get_products_by_category", Product.objects.filter(category=Product.Category.PHONE).order_by(*CATALOG_ORDERING)
+    yield "featured products", Product.objects.filter(is_featured=True).order_by(*CATALOG_ORDERING)[:page]
+    yield "filter_products ?sort=price", Product.objects.order_by('price', 'id')[:page]
+    yield "filter_products ?sort=discounted_price", Product.objects.order_by('discounted_price', 'id')[:page]
+    yield "filter_products ?category&sort=-discounted_price", Product.objects.filter(category=Product.Category.PHONE).order_by('-discounted_price', '-id')[:page]
+
+    yield "get_orders", Order.objects.order_by(*ORDER_FEED_ORDERING)[:page]
+    yield "get_orders (cursor)", Order.objects.filter(keyset_filter(ORDER_FEED_ORDERING, [now, 1])).order_by(*ORDER_FEED_ORDERING)[:page]
+    yield "get_orders ?status", Order.objects.filter(status=Order.OrderStatus.PENDING).order_by(*ORDER_FEED_ORDERING)[:page]
+    yield "get_orders ?payment_status", Order.objects.filter(payment_status=Order.PaymentStatus.PENDING).order_by(*ORDER_FEED_ORDERING)[:page]
+    yield "get_orders ?created_after", Order.objects.filter(created_at__gte=now).order_by(*ORDER_FEED_ORDERING)[:page]
+    yield "orders by customer_email", Order.objects.filter(customer_email="someone@example.com").order_by('-created_at')
+
+
+def full_scans(connection, queryset):
+    """Return ``(tables_fully_scanned, plan_lines)`` for a queryset on ``connection``."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f"EXPLAIN {sql}", params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            plan = [f"{row['table']}: type={row['type']} key={row['key']}" for row in rows]
+            return [row['table'] for row in rows if row['type'] == 'ALL'], plan
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = [row[-1] for row in cursor.fetchall()]
+            return [match['table'] for match in map(SQLITE_FULL_SCAN.match, plan) if match], plan
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"EXPLAIN {sql}", params)
+            plan = [row[0] for row in cursor.fetchall()]
+            return [match['table'] for line in plan for match in POSTGRES_FULL_SCAN.finditer(line)], plan
+    raise CommandError(f"EXPLAIN parsing is not implemented for {connection.vendor}")
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the hot catalog and order queries and fail if any of them needs a full table scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Database alias to explain against.")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print the plan of every query.")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        failures = []
+        for label, queryset in hot_queries():
+            tables, plan = full_scans(connection, queryset.using(options['database']))
+            if tables:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {label}: {', '.join(tables)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"ok         {label}"))
+            if tables or options['verbose_plans']:
+                for line in plan:
+                    self.stdout.write(f"    {line}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot quer{'y' if len(failures) == 1 else 'ies'} use a full table scan")
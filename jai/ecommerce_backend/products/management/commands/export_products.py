@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.catalog_io import PRODUCT_IO_FIELDS, RowWriter, detect_format
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Stream all products to a CSV or JSONL file (or stdout) in id order, one batch at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='-', help="Output file, or '-' for stdout (default).")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Output format (default: from the file extension).")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched per query.")
+
+    def handle(self, *args, **options):
+        path = options['output']
+        try:
+            fmt = detect_format(path, options['format'] or ('jsonl' if path == '-' else None))
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        stream = self.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+        try:
+            writer = RowWriter(stream, fmt)
+            count = 0
+            for row in self.iter_products(options['chunk_size']):
+                writer.write(row)
+                count += 1
+        finally:
+            if stream is not self.stdout:
+                stream.close()
+        self.stderr.write(f"Exported {count} products")
+
+    def iter_products(self, chunk_size):
+        """
+        Walk the table in id order with keyset batches.
+
+        Unlike ``.iterator()``, this keeps memory flat on MySQL too, where the
+        client library buffers a whole result set.
+        """
+        last_id = 0
+        queryset = Product.objects.order_by('id').values('id', *PRODUCT_IO_FIELDS)
+        while True:
+            rows = list(queryset.filter(id__gt=last_id)[:chunk_size])
+            for row in rows:
+                row['image'] = str(row['image'] or '')
+                yield {name: row[name] for name in PRODUCT_IO_FIELDS}
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1]['id']
@@ -0,0 +1,47 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.images import generate_variants, needs_variants, variant_sizes
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the thumbnail and responsive variants (WebP and JPEG) of product images across "
+        "a pool of worker processes. Products whose variants are current are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--product', type=int, action='append', dest='product_ids', help="Only this product id (repeatable).")
+        parser.add_argument('--force', action='store_true', help="Re-render even when variants are current.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Products rendered and written back per batch.")
+        parser.add_argument('--workers', type=int, help="Rendering processes (default: PRODUCT_IMAGES['WORKERS'] or CPU count).")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        products = Product.objects.only('id', 'image', 'image_variants', 'category').order_by('id')
+        if options['product_ids']:
+            products = products.filter(id__in=options['product_ids'])
+        self.stdout.write(f"Variants: {', '.join(f'{name} {edge}px' for name, edge in variant_sizes().items())}")
+
+        workers = options['workers'] or getattr(settings, 'PRODUCT_IMAGES', {}).get('WORKERS')
+        checked = updated = 0
+        last_id = 0
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            while True:
+                batch = list(products.filter(id__gt=last_id)[:options['batch_size']])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+                checked += len(batch)
+                stale = [product for product in batch if options['force'] and product.image or needs_variants(product)]
+                if stale:
+                    updated += generate_variants(stale, pool)
+                    self.stdout.write(f"  up to id {last_id}: {updated} updated")
+
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} products, rendered variants for {updated}"))
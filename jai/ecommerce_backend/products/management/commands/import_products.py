@@ -0,0 +1,93 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from products.cache import invalidate_product
+from products.catalog_io import clean_row, detect_format, read_rows
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert products from a CSV or JSONL file (matched on name), streaming the input "
+        "and writing it in batches. Use '-' to read from stdin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Input file, or '-' for stdin.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (default: from the file extension).")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows validated and written per batch.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; write nothing.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = detect_format(path, options['format'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        written = invalid = 0
+        try:
+            batch = {}
+            for line_number, row in read_rows(stream, fmt):
+                try:
+                    values, present = clean_row(row)
+                except ValidationError as e:
+                    invalid += 1
+                    details = e.message_dict if hasattr(e, 'error_dict') else {'row': e.messages}
+                    messages = '; '.join(f"{field}: {' '.join(errors)}" for field, errors in details.items())
+                    self.stderr.write(f"line {line_number}: {messages}")
+                    continue
+                batch[values['name']] = (values, present)  # Last row for a name wins
+                if len(batch) >= options['batch_size']:
+                    written += self.write_batch(batch, options['dry_run'])
+                    batch = {}
+            if batch:
+                written += self.write_batch(batch, options['dry_run'])
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        verb = "Validated" if options['dry_run'] else "Upserted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {written} products"))
+        if invalid:
+            raise CommandError(f"{invalid} invalid rows were skipped")
+
+    def write_batch(self, batch, dry_run):
+        """Upsert one batch with INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE statements."""
+        if dry_run:
+            return len(batch)
+
+        # Rows only update the columns they supply, so group them by column set
+        groups = {}
+        for values, present in batch.values():
+            product = Product(**values)
+            product.stock = max(product.stock, 0)
+            groups.setdefault(tuple(present), []).append(product)
+
+        conflict_target = ['name'] if connection.features.supports_update_conflicts_with_target else None
+        with transaction.atomic():
+            old_categories = set(
+                Product.objects.filter(name__in=batch).values_list('category', flat=True).distinct()
+            )
+            for present, products in groups.items():
+                update_fields = [name for name in present if name not in ('name', 'slug')] + ['updated_at']
+                Product.objects.bulk_create(
+                    Product.objects.assign_slugs(products),
+                    update_conflicts=True,
+                    unique_fields=conflict_target,
+                    update_fields=update_fields,
+                )
+            product_ids = list(Product.objects.filter(name__in=batch).values_list('id', flat=True))
+
+        # bulk_create sends no post_save signals, so evict cached catalog entries here
+        categories = old_categories | {product.category for products in groups.values() for product in products}
+        invalidate_product(None, categories)
+        for product_id in product_ids:
+            invalidate_product(product_id)
+        return len(batch)
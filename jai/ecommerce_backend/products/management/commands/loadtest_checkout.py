@@ -0,0 +1,189 @@
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db.models import Sum
+
+from products.bench import percentile
+from products.models import OrderItem, Product
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Results:
+    """Thread-safe tallies of one load-test run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}          # step -> [seconds]
+        self.statuses = Counter()    # (step, status)
+
+    def record(self, step, status, seconds):
+        with self._lock:
+            self.latencies.setdefault(step, []).append(seconds)
+            self.statuses[(step, status)] += 1
+
+
+def _call(base_url, method, path, body=None, timeout=30):
+    data = json.dumps(body).encode() if body is not None else None
+    request = Request(base_url + path, data=data, method=method, headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except HTTPError as e:
+        e.read()
+        status = e.code
+    except (URLError, OSError):
+        status = 'connection-error'
+    return status, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive concurrent browse -> add-to-cart -> create_order flows against a local server, "
+        "with Zipf-skewed product popularity, then check that stock was neither oversold nor lost."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Base URL of a running server (e.g. http://127.0.0.1:8000). "
+                                          "It must use this project's database for the stock check.")
+        parser.add_argument('--serve', action='store_true', help="Serve the project in-process on a free port instead.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Simulated shoppers running at once.")
+        parser.add_argument('--checkouts', type=int, default=500, help="Total checkout flows to run.")
+        parser.add_argument('--products', type=int, default=50, help="How many products (lowest ids) shoppers buy from.")
+        parser.add_argument('--skew', type=float, default=1.2,
+                            help="Zipf exponent for product popularity; 0 = uniform, higher = hotter head.")
+        parser.add_argument('--cart-size', type=int, default=3, help="Most distinct products in one cart.")
+        parser.add_argument('--max-quantity', type=int, default=2)
+        parser.add_argument('--reset-stock', type=int,
+                            help="Set every target product's stock to this value first, to force sell-outs.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for reproducible carts.")
+        parser.add_argument('--output', help="Write the report as JSON to this file.")
+
+    def handle(self, *args, **options):
+        if bool(options['url']) == bool(options['serve']):
+            raise CommandError("Pass exactly one of --url or --serve")
+
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:options['products']])
+        if not product_ids:
+            raise CommandError("No products to buy; seed some first (e.g. manage.py import_products)")
+        if options['reset_stock'] is not None:
+            Product.objects.filter(id__in=product_ids).update(stock=options['reset_stock'])
+        initial_stock = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'stock'))
+
+        server = None
+        base_url = (options['url'] or '').rstrip('/')
+        if options['serve']:
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+            server.set_app(get_wsgi_application())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_address[1]}"
+            self.stdout.write(f"Serving on {base_url}")
+
+        run_tag = f"loadtest-{uuid.uuid4().hex[:12]}"
+        weights = [1 / rank ** options['skew'] for rank in range(1, len(product_ids) + 1)]
+        results = Results()
+
+        def shopper(flow):
+            rng = random.Random(options['seed'] * 1_000_003 + flow)
+            status, seconds = _call(base_url, 'GET', '/api/products/?limit=20&fields=id,name,price')
+            results.record('browse', status, seconds)
+
+            cart = {}
+            for product_id in rng.choices(product_ids, weights, k=rng.randint(1, options['cart_size'])):
+                status, seconds = _call(base_url, 'GET', f'/api/products/{product_id}/')
+                results.record('view_product', status, seconds)
+                cart[product_id] = cart.get(product_id, 0) + rng.randint(1, options['max_quantity'])
+
+            body = {
+                'items': [{'id': product_id, 'quantity': quantity} for product_id, quantity in cart.items()],
+                'customer_name': run_tag,
+            }
+            status, seconds = _call(base_url, 'POST', '/api/orders/create/', body)
+            results.record('create_order', status, seconds)
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                list(pool.map(shopper, range(options['checkouts'])))
+        finally:
+            elapsed = time.perf_counter() - started
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+        report = self._report(results, elapsed, options, run_tag, initial_stock)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+        if report['stock']['inconsistent'] or report['stock']['negative']:
+            raise CommandError("Stock is inconsistent with the orders placed")
+
+    def _report(self, results, elapsed, options, run_tag, initial_stock):
+        steps = {}
+        for step, latencies in results.latencies.items():
+            latencies.sort()
+            statuses = {str(status): count for (name, status), count in results.statuses.items() if name == step}
+            failed = sum(count for status, count in statuses.items() if not status.startswith(('2', '4')))
+            steps[step] = {
+                'requests': len(latencies),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'statuses': statuses,
+                'error_rate': round(failed / len(latencies), 4),
+            }
+
+        # Every unit sold by this run must have left stock exactly once
+        sold = dict(
+            OrderItem.objects.filter(order__customer_name=run_tag).values('product')
+            .annotate(units=Sum('quantity')).values_list('product', 'units')
+        )
+        final_stock = dict(Product.objects.filter(id__in=initial_stock).values_list('id', 'stock'))
+        inconsistent = {
+            product_id: {'initial': stock, 'sold': sold.get(product_id, 0), 'final': final_stock.get(product_id)}
+            for product_id, stock in initial_stock.items()
+            if final_stock.get(product_id) != stock - sold.get(product_id, 0)
+        }
+        report = {
+            'checkouts': options['checkouts'],
+            'concurrency': options['concurrency'],
+            'skew': options['skew'],
+            'elapsed_seconds': round(elapsed, 3),
+            'checkouts_per_second': round(options['checkouts'] / elapsed, 1) if elapsed else None,
+            'steps': steps,
+            'stock': {
+                'products': len(initial_stock),
+                'units_sold': sum(sold.values()),
+                'sold_out': sum(1 for stock in final_stock.values() if stock == 0),
+                'negative': [product_id for product_id, stock in final_stock.items() if stock < 0],
+                'inconsistent': inconsistent,
+            },
+        }
+
+        self.stdout.write(f"{options['checkouts']} checkouts in {elapsed:.1f}s "
+                          f"({report['checkouts_per_second']}/s) with {options['concurrency']} shoppers")
+        for step, summary in steps.items():
+            self.stdout.write(f"  {step:<13} p50 {summary['p50_ms']:>8.2f} ms  p99 {summary['p99_ms']:>8.2f} ms  "
+                              f"errors {summary['error_rate']:.2%}  {summary['statuses']}")
+        stock = report['stock']
+        style = self.style.ERROR if stock['inconsistent'] or stock['negative'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"  stock: {stock['units_sold']} units sold, {stock['sold_out']}/{stock['products']} products sold out, "
+            f"{len(stock['inconsistent'])} inconsistent, {len(stock['negative'])} negative"
+        ))
+        return report
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.search import build_index, save_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the product search index from the database and write the snapshot that "
+        "server processes load on startup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Snapshot path (default: settings.SEARCH_INDEX_PATH).")
+
+    def handle(self, *args, **options):
+        path = options['output'] or settings.SEARCH_INDEX_PATH
+        if not path:
+            raise CommandError("Set SEARCH_INDEX_PATH or pass --output")
+
+        index = build_index()
+        save_snapshot(index, path)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {len(index)} products into {path}"))
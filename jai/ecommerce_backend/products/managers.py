@@ -1,4 +1,192 @@
+import re
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
 from django.contrib.auth.models import BaseUserManager
+from django.db import models, transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Length
+from django.utils import timezone
+from django.utils.text import slugify
+
+SLUG_LOOKUP_BATCH = 100  # Two OR terms per base; SQLite caps expression depth at 1000
+SLUG_SUFFIX_ROOM = 6  # Room left for a "-N" suffix, up to -99999
+
+
+class InsufficientStock(ValueError):
+    """Raised when a stock reservation cannot be satisfied."""
+
+    def __init__(self, product_ids=(), message="Not enough stock available."):
+        super().__init__(message)
+        self.product_ids = list(product_ids)
+
+
+class ProductQuerySet(models.QuerySet):
+    def recount_ratings(self):
+        """Recompute rating aggregates from the reviews (e.g. after bulk review deletes)."""
+        from .models import Review
+
+        reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        return self.update(
+            rating_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+            rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+            updated_at=timezone.now(),
+        )
+
+    def slug_base(self, name):
+        """
+        The slug ``name`` is numbered from, cut short enough that ``base-N``
+        still fits the slug column.
+        """
+        max_length = self.model._meta.get_field('slug').max_length
+        return slugify(name)[:max_length - SLUG_SUFFIX_ROOM].rstrip('-')
+
+    def next_slug(self, base_slug):
+        """
+        Return a free slug for ``base_slug`` with a single query.
+
+        Fetches only the longest (hence numerically largest) ``base_slug`` or
+        ``base_slug-N`` in use and returns the next suffix.
+        """
+        taken = (
+            self.filter(slug__startswith=base_slug)
+            .filter(Q(slug=base_slug) | Q(slug__regex=rf'^{re.escape(base_slug)}-[0-9]+$'))
+            .annotate(slug_length=Length('slug'))
+            .order_by('-slug_length', '-slug')
+            .values_list('slug', flat=True)
+            .first()
+        )
+        if taken is None:
+            return base_slug
+        if taken == base_slug:
+            return f"{base_slug}-1"
+        return f"{base_slug}-{int(taken.rsplit('-', 1)[1]) + 1}"
+
+    def assign_slugs(self, products):
+        """
+        Fill in unique slugs on unsaved products before ``bulk_create``.
+
+        Existing slugs for all base slugs in the batch are read with one query
+        per ``SLUG_LOOKUP_BATCH`` bases; suffixes are then handed out in memory,
+        also avoiding clashes within the batch. Returns ``products``.
+        """
+        products = list(products)
+        pending = [product for product in products if not product.slug]
+        bases = {self.slug_base(product.name) for product in pending}
+        highest = {}  # base slug -> highest suffix in use (0 for the bare base slug)
+
+        def record(slug):
+            if slug in bases:
+                highest[slug] = max(highest.get(slug, 0), 0)
+                return
+            head, _, tail = slug.rpartition('-')
+            if tail.isdigit() and head in bases:
+                highest[head] = max(highest.get(head, 0), int(tail))
+
+        for product in products:
+            if product.slug:
+                record(product.slug)
+
+        ordered = sorted(bases)
+        for start in range(0, len(ordered), SLUG_LOOKUP_BATCH):
+            chunk = ordered[start:start + SLUG_LOOKUP_BATCH]
+            lookup = reduce(or_, (Q(slug=base) | Q(slug__startswith=f"{base}-") for base in chunk))
+            for slug in self.filter(lookup).values_list('slug', flat=True).iterator():
+                record(slug)
+
+        for product in pending:
+            base = self.slug_base(product.name)
+            if base in highest:
+                highest[base] += 1
+                product.slug = f"{base}-{highest[base]}"
+            else:
+                highest[base] = 0
+                product.slug = base
+        return products
+
+    def reserve_stock(self, product_id, quantity):
+        """Atomically take ``quantity`` units of stock with one conditional UPDATE."""
+        updated = self.filter(pk=product_id, stock__gte=quantity).update(stock=F('stock') - quantity)
+        if not updated:
+            raise InsufficientStock([product_id])
+
+    def reserve_stock_bulk(self, quantities):
+        """
+        Reserve stock for several products at once, all or nothing.
+
+        ``quantities`` maps product id to quantity. A single
+        ``UPDATE ... SET stock = stock - CASE ... WHERE stock >= CASE ...`` is
+        issued; if any product falls short the update is rolled back and
+        ``InsufficientStock`` lists the offending ids.
+        """
+        quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        if not quantities:
+            return
+
+        needed = Case(
+            *(When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()),
+            output_field=IntegerField(),
+        )
+        with transaction.atomic(using=self.db):
+            updated = self.filter(pk__in=quantities, stock__gte=needed).update(stock=F('stock') - needed)
+            if updated == len(quantities):
+                return
+            transaction.set_rollback(True, using=self.db)
+
+        # Rolled back: report which products could not be covered
+        stock = dict(self.filter(pk__in=quantities).values_list('pk', 'stock'))
+        raise InsufficientStock([pid for pid, quantity in quantities.items() if stock.get(pid, 0) < quantity])
+
+
+class OrderManager(models.Manager):
+    def create_with_items(self, items, **order_fields):
+        """
+        Create an order and its items in one transaction with a constant query count.
+
+        ``items`` is an iterable of ``(product_id, quantity)`` pairs; repeated ids
+        are merged. Names and prices are fetched with one ``values_list`` (the
+        discounted price is computed by the database), stock is reserved
+        with one UPDATE, and items are written with one ``bulk_create``. Raises
+        ``Product.DoesNotExist`` for unknown ids and ``InsufficientStock`` when
+        stock runs short; either way nothing is written.
+        """
+        from .models import OrderItem, Product
+
+        quantities = {}
+        for product_id, quantity in items:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        with transaction.atomic(using=self.db):
+            products = {
+                product_id: (name, price)
+                for product_id, name, price in Product.objects.filter(id__in=list(quantities))
+                .values_list('id', 'name', 'discounted_price')
+            }
+            missing = [str(product_id) for product_id in quantities if product_id not in products]
+            if missing:
+                raise Product.DoesNotExist(f"Products not found: {', '.join(missing)}")
+
+            Product.objects.reserve_stock_bulk(quantities)
+
+            order_items = [
+                OrderItem(
+                    product_id=product_id,
+                    product_name=products[product_id][0],
+                    quantity=quantity,
+                    price=products[product_id][1],
+                )
+                for product_id, quantity in quantities.items()
+            ]
+            total_price = sum((item.price * item.quantity for item in order_items), Decimal(0))
+
+            order = self.model(total_price=total_price, **order_fields)
+            order.save(using=self.db)
+            for item in order_items:
+                item.order = order
+            OrderItem.objects.bulk_create(order_items)  # Stock is already reserved; save() is bypassed
+        return order
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, username, email=None, password=None, **extra_fields):
@@ -12,6 +200,16 @@ class CustomUserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def mark_seen(self, seen):
+        """Write ``{user_id: timestamp}`` to ``last_seen`` with a single UPDATE."""
+        if not seen:
+            return 0
+        timestamps = Case(
+            *(When(pk=user_id, then=Value(timestamp)) for user_id, timestamp in seen.items()),
+            output_field=models.DateTimeField(),
+        )
+        return self.filter(pk__in=list(seen)).update(last_seen=timestamps)
+
     def create_superuser(self, username, email=None, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', True)
         extra_fields.setdefault('is_superuser', True)
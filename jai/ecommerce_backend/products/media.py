@@ -0,0 +1,122 @@
+"""
+Serve ``MEDIA_ROOT`` with validators and long-lived caching.
+
+Every response carries an ``ETag`` (the file's SHA-256, hashed once per
+file version and remembered) and ``Last-Modified``, and conditional
+requests are answered with 304 before the file is opened. Content-addressed
+names such as the image variants in ``products.images`` never change, so
+they are cached as immutable and revalidated from the name alone.
+"""
+import hashlib
+import mimetypes
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .cache import LocalLRUCache
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# A 64-hex SHA-256 as the file name, e.g. variants/ab/ab12...ef.webp
+HASHED_NAME = re.compile(r'(?:^|/)(?P<digest>[0-9a-f]{64})\.\w+$')
+HASH_CHUNK = 1024 * 1024
+
+_hashes = None
+
+
+def _options():
+    return getattr(settings, 'MEDIA_SERVING', {})
+
+
+def _hash_cache():
+    global _hashes
+    if _hashes is None:
+        _hashes = LocalLRUCache(_options().get('HASH_CACHE_ENTRIES', 10000), timeout=None)
+    return _hashes
+
+
+def content_hash(path, stat):
+    """SHA-256 of the file at ``path``, cached until its size or mtime changes."""
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    digest = _hash_cache().get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            while chunk := f.read(HASH_CHUNK):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _hash_cache().set(key, digest)
+    return digest
+
+
+def _resolve(path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = Path(safe_join(settings.MEDIA_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    return path, full_path
+
+
+def _file_response(path, full_path):
+    """Hand the transfer to the front-end server if configured, else stream it with ``FileResponse``."""
+    header = _options().get('SENDFILE_HEADER')
+    if not header:
+        # FileResponse uses the server's wsgi.file_wrapper (sendfile) when it has one
+        return FileResponse(full_path.open('rb'))
+
+    response = HttpResponse(content_type=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+    if header == 'X-Accel-Redirect':  # nginx maps an internal location onto MEDIA_ROOT; the value is a URI
+        response[header] = _options().get('SENDFILE_PREFIX', '/protected-media/') + quote(path)
+    else:  # X-Sendfile (Apache, lighttpd) takes the file path itself
+        response[header] = str(full_path)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve one media file with ``ETag``/``Last-Modified`` validators and 304 responses."""
+    path, full_path = _resolve(path)
+
+    hashed = HASHED_NAME.search(path)
+    if hashed:
+        # The name is the content hash: revalidate without touching the disk
+        etag = f'"{hashed["digest"]}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            not_modified['Cache-Control'] = IMMUTABLE
+            return not_modified
+
+    try:
+        stat = full_path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Not found")
+    if not full_path.is_file():
+        raise Http404("Not found")
+
+    last_modified = int(stat.st_mtime)
+    if hashed:
+        cache_control = IMMUTABLE
+    else:
+        etag = f'"{content_hash(full_path, stat)}"'
+        cache_control = f"public, max-age={_options().get('MAX_AGE', 3600)}"
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            not_modified['Cache-Control'] = cache_control
+            return not_modified
+
+    response = _file_response(path, full_path)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+    return response
@@ -0,0 +1,165 @@
+import bisect
+import contextvars
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Literal IN lists differ only in length; fold them so they share a template
+_PLACEHOLDER_LIST = re.compile(r"%s(?:\s*,\s*%s)+")
+
+
+def sql_template(sql):
+    return _PLACEHOLDER_LIST.sub("%s...", sql)
+
+
+class RequestStats:
+    """What one request spent on SQL and serialization."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.serializer_time = 0.0
+        self.templates = Counter()
+        self._serializer_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - start
+            self.queries += 1
+            self.templates[sql_template(sql)] += 1
+
+    def repeated_queries(self, threshold):
+        """SQL templates run at least ``threshold`` times: the signature of an N+1."""
+        return {template: count for template, count in self.templates.items() if count >= threshold}
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+def current_stats():
+    return _current.get()
+
+
+@contextmanager
+def collecting(stats):
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def serializer_timer():
+    """Time serialization; nested serializers only count once, at the outermost level."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    stats._serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats._serializer_depth -= 1
+        if not stats._serializer_depth:
+            stats.serializer_time += time.perf_counter() - start
+
+
+class TimedSerializerMixin:
+    """Adds a serializer's ``to_representation`` time to the current request's stats."""
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels({**labels, "le": bound})} {cumulative}'
+        yield f'{name}_sum{_labels(labels)} {self.sum}'
+        yield f'{name}_count{_labels(labels)} {cumulative}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+    """Process-wide request metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = Counter()                                       # (route, method, status)
+            self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))  # (route, method)
+            self.query_counts = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+            self.query_seconds = Counter()
+            self.serializer_seconds = Counter()
+            self.response_bytes = Counter()
+            self.n_plus_one = Counter()
+
+    def observe(self, route, method, status, duration, stats, size, n_plus_one):
+        key = (route, method)
+        with self._lock:
+            self.requests[(route, method, status)] += 1
+            self.latency[key].observe(duration)
+            self.query_counts[key].observe(stats.queries)
+            self.query_seconds[key] += stats.query_time
+            self.serializer_seconds[key] += stats.serializer_time
+            self.response_bytes[key] += size
+            if n_plus_one:
+                self.n_plus_one[key] += 1
+
+    def render(self):
+        lines = []
+
+        def counter(name, help_text, values, label_names):
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} counter'])
+            for key, value in sorted(values.items()):
+                lines.append(f'{name}{_labels(dict(zip(label_names, key)))} {value}')
+
+        def histogram(name, help_text, values):
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} histogram'])
+            for (route, method), hist in sorted(values.items()):
+                lines.extend(hist.lines(name, {'route': route, 'method': method}))
+
+        with self._lock:
+            counter('http_requests_total', 'Requests handled.', self.requests, ('route', 'method', 'status'))
+            histogram('http_request_duration_seconds', 'Time spent handling requests.', self.latency)
+            histogram('db_queries_per_request', 'SQL queries run per request.', self.query_counts)
+            counter('db_query_seconds_total', 'Time spent in SQL queries.', self.query_seconds, ('route', 'method'))
+            counter('serializer_seconds_total', 'Time spent serializing responses.', self.serializer_seconds, ('route', 'method'))
+            counter('http_response_bytes_total', 'Response body bytes sent.', self.response_bytes, ('route', 'method'))
+            counter('n_plus_one_requests_total', 'Requests that repeated one SQL template past the threshold.', self.n_plus_one, ('route', 'method'))
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
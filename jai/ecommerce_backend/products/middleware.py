@@ -0,0 +1,241 @@
+import logging
+import time
+import zlib
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from .metrics import RequestStats, collecting, registry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """
+    Records latency, SQL query count and time, serializer time and response
+    size per route, and warns about N+1 query patterns.
+
+    Metrics are per process and served by ``/api/admin/metrics/``. A request
+    counts as N+1 when one SQL template runs at least
+    ``PERFORMANCE_METRICS['N_PLUS_ONE_THRESHOLD']`` times.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = getattr(settings, 'PERFORMANCE_METRICS', {})
+        self.n_plus_one_threshold = options.get('N_PLUS_ONE_THRESHOLD', 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def _capture_queries(stats):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(stats.record_query))
+        return stack
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        start = time.perf_counter()
+        with collecting(stats), self._capture_queries(stats):
+            response = self.get_response(request)
+        self._record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        start = time.perf_counter()
+        with collecting(stats):
+            # The async ORM runs queries on the request's thread-sensitive worker,
+            # so the wrappers are installed on that thread's connections
+            stack = await sync_to_async(self._capture_queries)(stats)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        self._record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def _record(self, request, response, stats, duration):
+        match = request.resolver_match
+        route = f"/{match.route}" if match else "unmatched"
+        repeated = stats.repeated_queries(self.n_plus_one_threshold)
+        if repeated:
+            template, count = max(repeated.items(), key=lambda item: item[1])
+            logger.warning("Possible N+1 in %s %s: %d runs of %s", request.method, route, count, template)
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(route, request.method, response.status_code, duration, stats, size, bool(repeated))
+
+
+class ASGIURLConfMiddleware:
+    """
+    Routes ASGI requests through ``settings.ASGI_URLCONF`` so they reach the
+    native async catalog views; WSGI requests keep the project URLconf.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, 'ASGI_URLCONF', None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+        return self.get_response(request)
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def compress(self, data):
+        return self._zlib.compress(data)
+
+    def flush(self):
+        return self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._zlib.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality):
+        self._brotli = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._brotli.process(data)
+
+    def flush(self):
+        return self._brotli.flush()
+
+    def finish(self):
+        return self._brotli.finish()
+
+
+def parse_accept_encoding(header):
+    """``{coding: q}`` from an ``Accept-Encoding`` header."""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+
+class CompressionMiddleware:
+    """
+    Compresses GET responses with brotli (when the ``brotli`` package is
+    installed) or gzip, whichever the client prefers.
+
+    Bodies under ``RESPONSE_COMPRESSION['MIN_SIZE']`` bytes are sent as-is.
+    Streaming responses are compressed chunk by chunk, flushing after each
+    one, so an export never has to be held in memory. Only GET/HEAD
+    responses of the configured types are touched; login tokens (POST) and
+    CSRF tokens (HTML) stay uncompressed, out of reach of BREACH-style attacks.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = getattr(settings, 'RESPONSE_COMPRESSION', {})
+        self.min_size = options.get('MIN_SIZE', 1024)
+        self.gzip_level = options.get('GZIP_LEVEL', 6)
+        self.brotli_quality = options.get('BROTLI_QUALITY', 5)
+        self.content_types = tuple(options.get('CONTENT_TYPES', ('application/json',)))
+        self.codings = ('br', 'gzip') if brotli is not None else ('gzip',)  # Server preference on ties
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def negotiate(self, header):
+        accepted = parse_accept_encoding(header)
+        default = accepted.get('*', 0.0)
+        best = max(self.codings, key=lambda coding: accepted.get(coding, default))
+        return best if accepted.get(best, default) > 0 else None
+
+    def _compressor(self, coding):
+        return BrotliCompressor(self.brotli_quality) if coding == 'br' else GzipCompressor(self.gzip_level)
+
+    def _compress(self, request, response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(self.content_types):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        coding = self.negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if coding is None:
+            return response
+
+        compressor = self._compressor(coding)
+        if not response.streaming:
+            compressed = compressor.compress(response.content) + compressor.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        elif response.is_async:
+            response.streaming_content = self._acompress_stream(compressor, response.streaming_content)
+            del response['Content-Length']
+        else:
+            response.streaming_content = self._compress_stream(compressor, response.streaming_content)
+            del response['Content-Length']
+
+        # The compressed bytes differ from the original, so a strong validator no longer holds
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
+
+    @staticmethod
+    def _compress_stream(compressor, chunks):
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    @staticmethod
+    async def _acompress_stream(compressor, chunks):
+        async for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0027_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0.0, editable=False, max_digits=10),
+        ),
+    ]
@@ -1,10 +1,13 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Cast, NullIf, Round
 from django.contrib.auth.models import AbstractUser
-from django.utils.text import slugify
+from django.utils import timezone
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
-from .managers import CustomUserManager
+from .cache import invalidate_product
+from .managers import CustomUserManager, OrderManager, ProductQuerySet
 
 
 # ✅ Custom User Model with Role-based Access
@@ -33,9 +36,14 @@ class User(AbstractUser):
     # Regular field instead of @property for better compatibility
     is_staff = models.BooleanField(default=False)
     raw_password = models.CharField(max_length=128,  null=True, editable=False)
+    last_seen = models.DateTimeField(null=True, blank=True, editable=False)  # Batched by CachedTokenAuthentication
     objects = CustomUserManager()
     class Meta:
         swappable = 'AUTH_USER_MODEL'
+        indexes = [
+            # Login resolves username OR email in one query
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
 
     @property
     def is_admin(self):
@@ -70,29 +78,94 @@ class Product(models.Model):
         default=Category.PHONE
     )
     image = models.ImageField(upload_to='products/', blank=True, default='products/default.jpg')
+    # Resized WebP/JPEG copies of `image`, written by products.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     discount = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal(0))
+    # Stored by the database so catalog sorts and price filters can use an index.
+    # Multiplying by 0.01 rather than dividing by 100 keeps SQLite off integer division.
+    discounted_price = models.GeneratedField(
+        expression=Round(F('price') * (Value(Decimal(100)) - F('discount')) * Value(Decimal('0.01')), 2),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+    )
     is_featured = models.BooleanField(default=False)
+    # Maintained by Review.save()/delete() so listings never aggregate reviews
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    average_rating = models.GeneratedField(
+        expression=Cast('rating_sum', models.FloatField()) / NullIf('rating_count', 0),
+        output_field=models.FloatField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the catalog (get_products)
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            # Category browsing and admin list_filter, in catalog order
+            models.Index(fields=['category', 'created_at', 'id'], name='product_category_created_idx'),
+            models.Index(fields=['is_featured', 'created_at', 'id'], name='product_featured_created_idx'),
+            # Search index catch-up reads rows changed since its watermark
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+            # Price sorts on the filtered catalog (filter_products)
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['discounted_price', 'id'], name='product_discounted_id_idx'),
+            models.Index(fields=['category', 'discounted_price', 'id'], name='product_category_disc_idx'),
+        ]
+
+    SLUG_ATTEMPTS = 3
+
     def save(self, *args, **kwargs):
-        """Generate unique slug and ensure stock is non-negative."""
-        if not self.slug:
-            base_slug = slugify(self.name)
-            slug = base_slug
-            count = 1
-            while Product.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{count}"
-                count += 1
-            self.slug = slug
+        """Generate unique slug and ensure stock is non-negative.
 
+        The rating aggregates belong to Review writes: full saves of an existing
+        product leave them alone, so an instance loaded before a review cannot
+        write back a stale rating.
+        """
         self.stock = max(self.stock, 0)  # Ensure stock is non-negative
-        super().save(*args, **kwargs)
-
-    @property
-    def discounted_price(self):
-        """Calculate the discounted price."""
-        return self.price * (Decimal(1) - self.discount / Decimal(100))
+        if self.pk is not None:
+            # The database recomputes generated fields; reload them lazily on next access
+            self.__dict__.pop('discounted_price', None)
+            self.__dict__.pop('average_rating', None)
+        deferred = self.get_deferred_fields()
+        if kwargs.get('update_fields') is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Like Django's own save of a partially loaded instance: only what was loaded,
+            # plus updated_at, which search catch-up and the caches rely on
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and not field.generated
+                and (field.attname not in deferred or field.name == 'updated_at')
+                and field.name not in ('rating_count', 'rating_sum')
+            ]
+        if 'slug' in deferred or self.slug:  # A deferred slug is left as stored
+            super().save(*args, **kwargs)
+            return
+
+        # One query picks the next free suffix; a concurrent insert of the same
+        # slug surfaces as an IntegrityError and is retried with a fresh suffix.
+        base_slug = Product.objects.slug_base(self.name)
+        for attempt in range(self.SLUG_ATTEMPTS):
+            self.slug = Product.objects.next_slug(base_slug)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                slug_taken = Product.objects.filter(slug=self.slug).exclude(pk=self.pk).exists()
+                if attempt == self.SLUG_ATTEMPTS - 1 or not slug_taken:
+                    self.slug = None
+                    raise
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored category so a category change also evicts the old listing
+        instance._loaded_category = instance.__dict__.get('category')
+        return instance
 
     def __str__(self):
         return f"{self.name} - {self.category}"
@@ -135,7 +208,8 @@ class Order(models.Model):
     total_price = models.DecimalField(
         max_digits=10, 
         decimal_places=2, 
-        default=0.00
+        default=0.00,
+        editable=False,  # Maintained by OrderItem writes; see Order.save()
     )
     status = models.CharField(
         max_length=50, 
@@ -150,29 +224,50 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderManager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Order"
         verbose_name_plural = "Orders"
+        indexes = [
+            # Order feed (get_orders) and admin changelist, newest first
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+            models.Index(fields=['payment_status', 'created_at', 'id'], name='order_payment_created_idx'),
+            models.Index(fields=['customer_email', 'created_at'], name='order_email_created_idx'),
+        ]
 
     def update_total_price(self):
-        """Update total price based on order items."""
-        total = sum(item.price * item.quantity for item in self.order_items.all())
-        self.total_price = total
-        self.save(update_fields=['total_price'])
+        """Recompute the total from the order items with one DB-side aggregate."""
+        total = self.order_items.aggregate(total=Sum(F('price') * F('quantity')))['total']
+        self.total_price = total or Decimal(0)
+        Order.objects.filter(pk=self.pk).update(total_price=self.total_price)
 
     def save(self, *args, **kwargs):
-        """Set customer details before saving."""
-        if self.customer and not self.customer_name:
-            self.customer_name = self.customer.get_full_name() or self.customer.username
-        if self.customer and not self.customer_email:
-            self.customer_email = self.customer.email
-            
-        is_new = self._state.adding  # Check if this is a new order
+        """Set customer details before saving.
+
+        The total is maintained incrementally by OrderItem writes, so saving an
+        order never re-reads its items. Full saves of an existing order leave
+        ``total_price`` alone, so an instance loaded before an item changed
+        cannot write back a stale total; pass ``update_fields`` to set it.
+        """
+        if kwargs.get('update_fields') is None:
+            # Like Django's own save of a partially loaded instance: only what was loaded, plus updated_at
+            deferred = self.get_deferred_fields()
+            if 'customer_id' not in deferred and self.customer_id:
+                if 'customer_name' not in deferred and not self.customer_name:
+                    self.customer_name = self.customer.get_full_name() or self.customer.username
+                if 'customer_email' not in deferred and not self.customer_email:
+                    self.customer_email = self.customer.email
+            if not self._state.adding and not kwargs.get('force_insert'):
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'total_price'
+                    and (field.attname not in deferred or field.name == 'updated_at')
+                ]
+
         super().save(*args, **kwargs)
-        
-        if is_new or 'update_fields' not in kwargs:  # Update price if not partial save
-            self.update_total_price()
 
     def __str__(self):
         return f"Order #{self.id} - {self.customer_name or 'Guest'} - {self.get_status_display()} (${self.total_price})"
@@ -190,24 +285,65 @@ class OrderItem(models.Model):
     class Meta:
         db_table = 'products_orderitem'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this row contributed to its order's total
+        loaded = instance.__dict__
+        if {'order_id', 'price', 'quantity'} <= loaded.keys():
+            instance._loaded_total = (loaded['order_id'], loaded['price'] * loaded['quantity'])
+        return instance
+
+    def _apply_to_total(self, order_id, amount):
+        if amount:
+            Order.objects.filter(pk=order_id).update(total_price=F('total_price') + amount)
+            # Keep a loaded order in step with the row
+            if OrderItem.order.is_cached(self) and self.order.pk == order_id:
+                total = Order._meta.get_field('total_price').to_python(self.order.total_price)  # The default is a float
+                self.order.total_price = total + amount
+
     def save(self, *args, **kwargs):
-        """Auto-set price based on product's discounted price and manage stock."""
+        """Auto-set price, manage stock and keep the order total in step."""
         if not self.price:
             self.price = self.product.discounted_price
 
         # Ensure product name is always stored
         self.product_name = self.product.name
 
-        # Ensure enough stock is available
-        if self.pk is None and self.product.stock < self.quantity:
-            raise ValueError("Not enough stock available.")
-
-        # Deduct stock only on first save (new order item)
-        if self.pk is None:
-            self.product.stock -= self.quantity
-            self.product.save()
-
-        super().save(*args, **kwargs)
+        if self.pk is not None:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                previous = getattr(self, '_loaded_total', None)
+                amount = self.price * self.quantity
+                if previous is None:
+                    self.order.update_total_price()
+                elif previous[0] != self.order_id:
+                    self._apply_to_total(previous[0], -previous[1])
+                    self._apply_to_total(self.order_id, amount)
+                else:
+                    self._apply_to_total(self.order_id, amount - previous[1])
+            self._loaded_total = (self.order_id, self.price * self.quantity)
+            return
+
+        # Deduct stock only on first save (new order item). The conditional UPDATE
+        # raises InsufficientStock (a ValueError) instead of overselling.
+        with transaction.atomic():
+            Product.objects.reserve_stock(self.product_id, self.quantity)
+            super().save(*args, **kwargs)
+            self._apply_to_total(self.order_id, self.price * self.quantity)
+        self.product.stock -= self.quantity  # Keep the in-memory instance in step
+        self._loaded_total = (self.order_id, self.price * self.quantity)
+
+    def delete(self, *args, **kwargs):
+        """Delete the item and subtract it from the order total.
+
+        Bulk queryset deletes bypass this; use Order.update_total_price() after them.
+        """
+        order_id, amount = self.order_id, self.price * self.quantity
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._apply_to_total(order_id, -amount)
+        return result
 
     def __str__(self):
         return f"{self.quantity} x {self.product_name} (${self.price})"
@@ -223,5 +359,71 @@ class Review(models.Model):
     comment = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Newest-first review pages per product (product_reviews)
+            models.Index(fields=['product', 'created_at', 'id'], name='review_product_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this row contributed to its product's rating
+        loaded = instance.__dict__
+        if {'product_id', 'rating'} <= loaded.keys():
+            instance._loaded_rating = (loaded['product_id'], loaded['rating'])
+        return instance
+
+    def _apply_to_rating(self, product_id, count, amount, category):
+        if count or amount:
+            Product.objects.filter(pk=product_id).update(
+                rating_count=F('rating_count') + count,
+                rating_sum=F('rating_sum') + amount,
+                updated_at=timezone.now(),
+            )
+            # Keep a loaded product in step with the row; deferred fields load fresh anyway
+            if Review.product.is_cached(self) and self.product.pk == product_id:
+                loaded = self.product.__dict__
+                if 'rating_count' in loaded:
+                    loaded['rating_count'] += count
+                if 'rating_sum' in loaded:
+                    loaded['rating_sum'] += amount
+                loaded.pop('average_rating', None)
+            # Cached catalog entries carry the rating
+            transaction.on_commit(lambda: invalidate_product(product_id, [category]))
+
+    def save(self, *args, **kwargs):
+        """Save the review and keep the product's rating aggregates in step."""
+        adding = self._state.adding
+        previous = getattr(self, '_loaded_rating', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            product_id, category = self.product_id, self.product.category
+            if adding:
+                self._apply_to_rating(self.product_id, 1, self.rating, category)
+            elif previous is None:
+                # Loaded without its product or rating; recount from the reviews
+                Product.objects.filter(pk=product_id).recount_ratings()
+                self.product.refresh_from_db(fields=['rating_count', 'rating_sum', 'average_rating'])
+                transaction.on_commit(lambda: invalidate_product(product_id, [category]))
+            elif previous[0] != self.product_id:
+                previous_category = Product.objects.values_list('category', flat=True).get(pk=previous[0])
+                self._apply_to_rating(previous[0], -1, -previous[1], previous_category)
+                self._apply_to_rating(self.product_id, 1, self.rating, category)
+            else:
+                self._apply_to_rating(self.product_id, 0, self.rating - previous[1], category)
+        self._loaded_rating = (self.product_id, self.rating)
+
+    def delete(self, *args, **kwargs):
+        """Delete the review and subtract it from the product's rating.
+
+        Bulk queryset deletes bypass this; use Product.objects.recount_ratings() after them.
+        """
+        product_id, rating, category = self.product_id, self.rating, self.product.category
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._apply_to_rating(product_id, -1, -rating, category)
+        return result
+
     def __str__(self):
         return f"Review by {self.user.username} for {self.product.name} - {self.rating} stars"
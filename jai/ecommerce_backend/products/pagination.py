@@ -0,0 +1,120 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a ``limit`` query parameter, clamped to ``maximum``."""
+    if raw in (None, ""):
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, maximum)
+
+
+def parse_fields(raw, allowed):
+    """Parse a comma separated ``fields`` parameter against the allowed field names."""
+    if not raw:
+        return list(allowed)
+    fields = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    """Encode the ordering values of the last row into an opaque cursor."""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, model, ordering):
+    """Decode a cursor produced by ``encode_cursor`` back into typed ordering values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError("Invalid cursor")
+
+    decoded = []
+    for name, value in zip(ordering, values):
+        try:
+            field = model._meta.get_field(name.lstrip("-"))
+        except FieldDoesNotExist:
+            decoded.append(value)  # Annotations are compared as-is
+            continue
+        try:
+            decoded.append(field.to_python(value))
+        except ValidationError:
+            raise ValueError("Invalid cursor")
+    return decoded
+
+
+def keyset_filter(ordering, values):
+    """Build the keyset predicate selecting rows strictly after ``values``."""
+    condition = Q()
+    for i, name in enumerate(ordering):
+        field = name.lstrip("-")
+        lookup = "lt" if name.startswith("-") else "gt"
+        branch = Q(**{f"{field}__{lookup}": values[i]})
+        for previous, value in zip(ordering[:i], values[:i]):
+            branch &= Q(**{previous.lstrip("-"): value})
+        condition |= branch
+    return condition
+
+
+def _row_value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def _page_queryset(queryset, ordering, cursor, limit):
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor, queryset.model, ordering)))
+    return queryset.order_by(*ordering)[:limit + 1]
+
+
+def _trim_page(rows, ordering, limit):
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([_row_value(last, name.lstrip("-")) for name in ordering])
+
+
+def keyset_paginate(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return ``(rows, next_cursor)`` for one page of ``queryset``.
+
+    ``ordering`` must end in a unique column (normally ``id``) so every row has
+    a distinct position. Only ``limit + 1`` rows are fetched, in a single query.
+    """
+    ordering = tuple(ordering)
+    return _trim_page(list(_page_queryset(queryset, ordering, cursor, limit)), ordering, limit)
+
+
+async def akeyset_paginate(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Async ``keyset_paginate`` for async views."""
+    ordering = tuple(ordering)
+    return _trim_page([row async for row in _page_queryset(queryset, ordering, cursor, limit)], ordering, limit)
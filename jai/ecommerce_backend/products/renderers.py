@@ -0,0 +1,76 @@
+"""
+JSON rendering backed by orjson when it is installed.
+
+Output is byte-for-byte what DRF's ``JSONRenderer`` produces with the
+project's settings (compact, unescaped UTF-8, decimals and datetimes via
+DRF's encoder). Without orjson, or when indented output is asked for, the
+stdlib encoder is used. ``streaming_json_response`` sends a JSON array one
+batch at a time, for exports too large to build in memory.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def dumps(data):
+    """Encode ``data`` to JSON bytes the way ``JSONRenderer`` would."""
+    if orjson is not None:
+        ret = orjson.dumps(
+            data, default=_encoder.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+    else:
+        ret = json.dumps(data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+    # Escaped by JSONRenderer too, as they end a line in JavaScript
+    if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+        ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return ret
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+def iter_json_array(batches):
+    """Yield one JSON array as bytes, a chunk per batch of serialized items."""
+    yield b'['
+    separator = b''
+    for batch in batches:
+        if batch:
+            yield separator + dumps(batch)[1:-1]  # The items without their brackets
+            separator = b','
+    yield b']'
+
+
+async def _aiterate(chunks):
+    # One chunk per hop to the request's sync thread, where the ORM queries run
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def streaming_json_response(batches, request):
+    """
+    Stream ``batches`` (lists of serialized items) as one JSON array.
+
+    ASGI is given an async iterator; Django would otherwise read a sync one
+    into memory before sending it.
+    """
+    chunks = iter_json_array(batches)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        chunks = _aiterate(chunks)
+    return StreamingHttpResponse(chunks, content_type='application/json')
@@ -0,0 +1,313 @@
+import bisect
+import heapq
+import logging
+import math
+import os
+import pickle
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+NAME_WEIGHT = 3          # A name token counts as this many description tokens
+MAX_PREFIX_EXPANSIONS = 50
+COMMON_TERM_RATIO = 0.5  # Terms in more documents than this act as stopwords next to rarer ones
+BUILD_BATCH_SIZE = 5000
+CATCH_UP_OVERLAP = timedelta(seconds=5)  # Re-read rows whose transaction committed late
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class InvertedIndex:
+    """
+    In-memory BM25 index over product names and descriptions.
+
+    The last query token also matches as a prefix, so partially typed words
+    find results. Thread-safe; snapshots can be pickled to disk.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._postings = defaultdict(dict)  # term -> {product_id: weighted term frequency}
+        self._doc_terms = {}                # product_id -> {term: weighted term frequency}
+        self._doc_length = {}
+        self._total_length = 0
+        self._terms = []                    # Sorted vocabulary for prefix lookups
+        self._lock = threading.RLock()
+        self.synced_until = None            # Newest Product.updated_at seen
+        self.checked_at = 0.0
+
+    def __len__(self):
+        return len(self._doc_length)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_postings'] = dict(self._postings)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._postings = defaultdict(dict, state['_postings'])
+        self._lock = threading.RLock()
+
+    def add(self, product_id, name, description, updated_at=None):
+        terms = defaultdict(int)
+        for token in tokenize(name):
+            terms[token] += NAME_WEIGHT
+        for token in tokenize(description):
+            terms[token] += 1
+
+        with self._lock:
+            self._remove(product_id)
+            for term, frequency in terms.items():
+                if term not in self._postings:
+                    bisect.insort(self._terms, term)
+                self._postings[term][product_id] = frequency
+            self._doc_terms[product_id] = dict(terms)
+            self._doc_length[product_id] = sum(terms.values())
+            self._total_length += self._doc_length[product_id]
+            if updated_at is not None and (self.synced_until is None or updated_at > self.synced_until):
+                self.synced_until = updated_at
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def product_ids(self):
+        with self._lock:
+            return set(self._doc_length)
+
+    def _remove(self, product_id):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                self._terms.pop(bisect.bisect_left(self._terms, term))
+        self._total_length -= self._doc_length.pop(product_id)
+
+    def _expand(self, prefix):
+        start = bisect.bisect_left(self._terms, prefix)
+        expanded = []
+        for term in self._terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            expanded.append(term)
+        return expanded
+
+    def search(self, query, limit=20):
+        """Return up to ``limit`` ``(product_id, score)`` pairs, best first."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            documents = len(self._doc_length)
+            if not documents:
+                return []
+            average_length = self._total_length / documents
+            matched = []
+            for position, token in enumerate(tokens):
+                terms = self._expand(token) if position == len(tokens) - 1 else [token]
+                matched.extend((term, self._postings[term]) for term in terms if term in self._postings)
+            # Near-universal terms barely change the ranking but dominate the cost
+            rare = [(term, postings) for term, postings in matched if len(postings) <= documents * COMMON_TERM_RATIO]
+            if rare:
+                matched = rare
+
+            scores = defaultdict(float)
+            for term, postings in matched:
+                idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+                for product_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_length[product_id] / average_length)
+                    scores[product_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+
+# Process-wide index ---------------------------------------------------------
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _snapshot_path():
+    return getattr(settings, 'SEARCH_INDEX_PATH', None)
+
+
+def _index_rows(index, queryset):
+    """Index ``queryset`` rows in keyset batches so memory stays flat."""
+    last_id = 0
+    rows = queryset.order_by('id').values_list('id', 'name', 'description', 'updated_at')
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:BUILD_BATCH_SIZE])
+        for product_id, name, description, updated_at in batch:
+            index.add(product_id, name, description, updated_at)
+        if len(batch) < BUILD_BATCH_SIZE:
+            return
+        last_id = batch[-1][0]
+
+
+def build_index():
+    """Build a fresh index from the database."""
+    from .models import Product
+
+    index = InvertedIndex()
+    _index_rows(index, Product.objects.all())
+    index.checked_at = time.monotonic()
+    return index
+
+
+def save_snapshot(index, path):
+    """Write ``index`` to ``path`` atomically."""
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def _drop_deleted(index):
+    """
+    Remove products that no longer exist; deletes leave no ``updated_at`` to catch up on.
+
+    A COUNT decides whether anything was deleted; only then are the ids compared.
+    """
+    from .models import Product
+
+    # Ids first: anything indexed by then was committed, so a missing row really is deleted
+    indexed = index.product_ids()
+    if len(indexed) == Product.objects.count():
+        return
+    for product_id in indexed - set(Product.objects.values_list('id', flat=True).iterator()):
+        index.remove(product_id)
+
+
+def catch_up(index):
+    """Re-index products written or deleted since the index was last synced (e.g. by other processes)."""
+    from .models import Product
+
+    index.checked_at = time.monotonic()
+    if index.synced_until is None:
+        _index_rows(index, Product.objects.all())
+    else:
+        _index_rows(index, Product.objects.filter(updated_at__gte=index.synced_until - CATCH_UP_OVERLAP))
+    _drop_deleted(index)
+
+
+def load_index():
+    """
+    Load the snapshot written by ``manage.py rebuild_search_index`` and catch it
+    up, or build the index from the database when there is no snapshot.
+    """
+    path = _snapshot_path()
+    if path and os.path.exists(path):
+        with open(path, 'rb') as f:
+            index = pickle.load(f)
+        catch_up(index)
+        return index
+    return build_index()
+
+
+# Loading and catching up run on one background thread, never in a request
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search-index')
+_task = None
+
+
+def _in_background(work):
+    try:
+        work()
+    except Exception:
+        logger.exception("Search index refresh failed")
+    finally:
+        connections.close_all()  # This thread's connections only
+
+
+def _load():
+    global _index
+    index = load_index()
+    with _index_lock:
+        _index = index
+
+
+def _catch_up():
+    if _index is not None:
+        catch_up(_index)
+
+
+def _schedule(work):
+    """Run ``work`` in the background unless a load or catch-up is already pending."""
+    global _task
+    with _index_lock:
+        if _task is None or _task.done():
+            _task = _background.submit(_in_background, work)
+        return _task
+
+
+def get_index():
+    """
+    Return the process-wide index, or ``None`` until its first load has finished.
+
+    The first call starts loading it in the background. Afterwards the index
+    catches up with writes from other processes at most every
+    ``SEARCH_INDEX_REFRESH`` seconds, also in the background; requests keep
+    using the current index meanwhile.
+    """
+    if _index is None:
+        _schedule(_load)
+    elif not index_fresh():
+        _index.checked_at = time.monotonic()  # Schedule once per interval
+        _schedule(_catch_up)
+    return _index
+
+
+def wait_for_index(timeout=None):
+    """Block until the pending load or catch-up finishes (for commands and tests)."""
+    task = _task
+    if task is not None:
+        task.result(timeout)
+    return _index
+
+
+def search_database(query, limit):
+    """
+    ``(product_id, score)`` pairs for products whose name contains every query
+    token, for the first seconds of a process while its index is still loading.
+    """
+    from .models import Product
+
+    products = Product.objects.all()
+    for token in tokenize(query):
+        products = products.filter(name__icontains=token)
+    return [(product_id, 0.0) for product_id in products.order_by('id').values_list('id', flat=True)[:limit]]
+
+
+def index_loaded():
+    return _index is not None
+
+
+def index_fresh():
+    """True when the index is loaded and needs no catch-up yet."""
+    return _index is not None and time.monotonic() - _index.checked_at <= getattr(settings, 'SEARCH_INDEX_REFRESH', 60)
+
+
+def reset_index():
+    """Forget the process-wide index, after any pending load or catch-up has finished."""
+    global _index
+    wait_for_index()
+    with _index_lock:
+        _index = None
@@ -1,27 +1,75 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import Product, User, Order
+from django.core.files.storage import default_storage
+from .images import FORMATS
+from .metrics import TimedSerializerMixin
+from .models import Product, User, Order, OrderItem, Review
 
 
 
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ImageVariantsField(serializers.Field):
+    """Renders stored ``image_variants`` names as URLs: ``{size: {width, height, webp, jpeg}}``."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return {
+            size: {key: default_storage.url(item) if key in FORMATS else item for key, item in variant.items()}
+            for size, variant in value.items()
+            if size != 'source'
+        }
+
+
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     image = serializers.CharField(required=False, allow_blank=True)  # Allow URLs
+    discounted_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)  # Computed by the database
+    average_rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+    image_variants = ImageVariantsField()  # Resized copies; prefer these over `image` in listings
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'price',  'description','category', 'image']
+        fields = ['id', 'name', 'price', 'discounted_price', 'description','category', 'image',
+                  'image_variants', 'rating_count', 'average_rating']
+
+    def __init__(self, *args, **kwargs):
+        """Accepts an optional ``fields`` list to serialize only a subset of fields."""
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+# ✅ Review Serializer
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    user = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Review
+        fields = ['id', 'user', 'rating', 'comment', 'created_at']
+
+
+# ✅ Order Item Serializer
+class OrderItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'product_name', 'quantity', 'price']
+
 
 # ✅ Order Serializer
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    items = OrderItemSerializer(source='order_items', many=True, read_only=True)
+
     class Meta:
         model = Order
         fields = '__all__'
 
 
 # ✅ User Serializer
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Handles user serialization and password encryption."""
     
     password = serializers.CharField(write_only=True, min_length=6)
@@ -59,15 +107,9 @@ class LoginSerializer(serializers.Serializer):
         if not identifier or not password:
             raise serializers.ValidationError("Username/Email and Password are required.")
 
-        user = None
-
-        # Check if the identifier is an email or username
-        if '@' in identifier:
-            user = User.objects.filter(email=identifier).first()
-        else:
-            user = User.objects.filter(username=identifier).first()
-
-        if user and user.check_password(password):
+        # The auth backend resolves username or email with a single lookup
+        user = authenticate(self.context.get('request'), username=identifier, password=password)
+        if user:
             return {"user": user}  # Return the user object
 
         raise serializers.ValidationError("Invalid login credentials.")
@@ -0,0 +1,59 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import images, search
+from .authentication import forget_token, forget_user
+from .backends import forget_token_key
+from .cache import invalidate_product
+from .models import Product, User
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    """Evict cached catalog entries once the write is committed."""
+    product_id = instance.pk
+    # Both the new and the previously stored category listing are affected
+    categories = {instance.category, getattr(instance, '_loaded_category', None)}
+    instance._loaded_category = instance.category
+    transaction.on_commit(lambda: invalidate_product(product_id, categories))
+
+
+@receiver(post_save, sender=Product)
+def make_image_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Render resized copies of a new or replaced image off the request thread."""
+    if not raw and (update_fields is None or 'image' in update_fields):
+        images.schedule_variants(instance)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    """Keep this process's search index in step; other processes catch up on their own."""
+    if update_fields is not None and not {'name', 'description'} & update_fields:
+        return
+    if search.index_loaded():
+        product_id, name, description, updated_at = instance.pk, instance.name, instance.description, instance.updated_at
+        transaction.on_commit(lambda: search.get_index().add(product_id, name, description, updated_at))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    if search.index_loaded():
+        product_id = instance.pk
+        transaction.on_commit(lambda: search.get_index().remove(product_id))
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Logins must not hand out, nor requests accept, a token that no longer exists."""
+    forget_token_key(instance.user_id)
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_changed_user(sender, instance, created=False, update_fields=None, **kwargs):
+    """Cached credentials carry the user, so status or permission changes evict them."""
+    if not created and (update_fields is None or not set(update_fields) <= {'last_login'}):
+        forget_user(instance.pk)
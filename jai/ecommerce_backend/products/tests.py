@@ -1,3 +1,1119 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image as PILImage
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+
+from . import async_views, bench, search
+from .authentication import CachedTokenAuthentication, LastSeenBuffer
+from .backends import token_key_for
+from .cache import LocalLRUCache, get_catalog_cache, invalidate_product, product_key
+from .compiled import row_serializer
+from .etags import product_etag
+from .images import _generate_in_background, generate_variants, needs_variants, render_variants, save_variants
+from .managers import InsufficientStock
+from .media import serve_media
+from .middleware import CompressionMiddleware, parse_accept_encoding
+from .models import Order, OrderItem, Product, Review, User
+from .renderers import dumps, iter_json_array
+from .search import reset_index
+from .serializers import OrderSerializer, ProductSerializer
+from .views import _attach_items
+
+
+def make_product(name="Phone", price="10.00", stock=10, **fields):
+    return Product.objects.create(name=name, description="Test", price=Decimal(price), stock=stock, **fields)
+
+
+class QueryBudgetTests(TransactionTestCase):
+    """Every route stays within the SQL query budget declared in ``bench.ROUTES``.
+
+    A transaction test case, so savepoints do not inflate the counts. The
+    benchmark itself is ``manage.py benchmark_api``.
+    """
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        reset_index()
+        self.addCleanup(reset_index)  # Lets a background index load finish before the tables are flushed
+
+    @override_settings(PASSWORD_HASHER_ITERATIONS=1000)
+    def test_routes_stay_within_query_budgets(self):
+        bench_data = bench.seed(products=40, users=5, orders=10, reviews=40)
+        client = Client()
+        for route in bench.ROUTES:
+            with self.subTest(route=route.name):
+                result = bench.run_route(client, route, bench_data, iterations=3)
+                self.assertEqual(result['statuses'], [route.status])
+                self.assertLessEqual(result['max_queries'], route.budget)
+
+
+class ReserveStockTests(TestCase):
+    def test_reserve_takes_stock(self):
+        product = make_product(stock=5)
+        Product.objects.reserve_stock(product.id, 3)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 2)
+
+    def test_insufficient_reservation_raises_and_leaves_stock(self):
+        product = make_product(stock=2)
+        with self.assertRaises(InsufficientStock) as raised:
+            Product.objects.reserve_stock(product.id, 3)
+        self.assertEqual(raised.exception.product_ids, [product.id])
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 2)
+
+    def test_bulk_reservation_is_all_or_nothing(self):
+        plenty, short = make_product("A", stock=10), make_product("B", stock=1)
+        with self.assertRaises(InsufficientStock) as raised:
+            Product.objects.reserve_stock_bulk({plenty.id: 4, short.id: 2})
+        self.assertEqual(raised.exception.product_ids, [short.id])
+        self.assertEqual(
+            dict(Product.objects.values_list('id', 'stock')), {plenty.id: 10, short.id: 1}
+        )
+
+        Product.objects.reserve_stock_bulk({plenty.id: 4, short.id: 1})
+        self.assertEqual(
+            dict(Product.objects.values_list('id', 'stock')), {plenty.id: 6, short.id: 0}
+        )
+
+
+class ConcurrentReserveStockTests(TransactionTestCase):
+    def test_concurrent_reservations_never_oversell(self):
+        product = make_product(stock=5)
+        outcomes = []
+        start = threading.Barrier(10)
+
+        def buy():
+            start.wait()
+            try:
+                Product.objects.reserve_stock(product.id, 1)
+                outcomes.append('ok')
+            except InsufficientStock:
+                outcomes.append('short')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(outcomes), ['ok'] * 5 + ['short'] * 5)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+
+
+class CreateOrderTests(TestCase):
+    def test_items_snapshot_names_and_discounted_prices(self):
+        phone = make_product("Phone", price="100.00", discount=Decimal("10"), stock=5)
+        cable = make_product("Cable", price="4.99", stock=5)
+
+        order = Order.objects.create_with_items([(phone.id, 1), (cable.id, 2), (phone.id, 1)], customer_name="Ann")
+
+        items = {item.product_id: item for item in order.order_items.all()}
+        self.assertEqual(items[phone.id].quantity, 2)  # Repeated ids are merged
+        self.assertEqual(items[phone.id].price, Decimal("90.00"))
+        self.assertEqual(items[cable.id].product_name, "Cable")
+        self.assertEqual(order.total_price, Decimal("189.98"))
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal("189.98"))
+        self.assertEqual(dict(Product.objects.values_list('id', 'stock')), {phone.id: 3, cable.id: 3})
+
+        # Later price changes do not touch placed orders
+        Product.objects.filter(id=phone.id).update(price=Decimal("500.00"))
+        self.assertEqual(OrderItem.objects.get(order=order, product=phone).price, Decimal("90.00"))
+
+    def test_short_stock_rolls_back_everything(self):
+        phone, cable = make_product("Phone", stock=5), make_product("Cable", stock=1)
+        with self.assertRaises(InsufficientStock) as raised:
+            Order.objects.create_with_items([(phone.id, 2), (cable.id, 2)])
+        self.assertEqual(raised.exception.product_ids, [cable.id])
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(dict(Product.objects.values_list('id', 'stock')), {phone.id: 5, cable.id: 1})
+
+    def test_unknown_product_rolls_back_everything(self):
+        phone = make_product("Phone", stock=5)
+        with self.assertRaises(Product.DoesNotExist):
+            Order.objects.create_with_items([(phone.id, 1), (phone.id + 100, 1)])
+        self.assertFalse(Order.objects.exists())
+        phone.refresh_from_db()
+        self.assertEqual(phone.stock, 5)
+
+
+class OrderTotalTests(TestCase):
+    def setUp(self):
+        self.product = make_product(price="10.50", stock=20)
+        self.order = Order.objects.create(customer_name="Ann")
+
+    def assertTotal(self, expected):
+        self.assertEqual(self.order.total_price, Decimal(expected))
+        self.assertEqual(Order.objects.get(pk=self.order.pk).total_price, Decimal(expected))
+
+    def test_item_writes_keep_total_through_order_saves(self):
+        stale = Order.objects.get(pk=self.order.pk)
+
+        item = OrderItem.objects.create(order=self.order, product=self.product, quantity=3)
+        self.assertTotal("31.50")
+        self.order.status = Order.OrderStatus.SHIPPED
+        self.order.save()
+        self.assertTotal("31.50")
+
+        item.quantity = 2
+        item.save()
+        self.assertTotal("21.00")
+        self.order.save()
+        self.assertTotal("21.00")
+
+        stale.customer_address = "Somewhere"
+        stale.save()  # Loaded before any item existed
+        self.assertTotal("21.00")
+
+        item.delete()
+        self.assertTotal("0.00")
+        self.order.save()
+        self.assertTotal("0.00")
+
+    def test_partially_loaded_order_saves_only_its_loaded_fields(self):
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1)
+        order = Order.objects.only('id', 'status').get(pk=self.order.pk)
+        order.status = Order.OrderStatus.SHIPPED
+        with self.assertNumQueries(1):  # No SELECT per deferred field
+            order.save()
+        stored = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((stored.status, stored.customer_name, stored.total_price),
+                         (Order.OrderStatus.SHIPPED, "Ann", Decimal("10.50")))
+        self.assertGreater(stored.updated_at, self.order.updated_at)
+
+    def test_total_is_read_only_in_the_admin(self):
+        admin_user = User.objects.create_user("admin", is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        url = f"/admin/products/order/{self.order.pk}/change/"
+        form = self.client.get(url).context['adminform'].form
+        self.assertNotIn('total_price', form.fields)
+        self.assertContains(self.client.get(url), "Total price")
+
+    def test_total_can_still_be_set_explicitly(self):
+        self.order.total_price = Decimal("5.00")
+        self.order.save(update_fields=['total_price'])
+        self.assertTotal("5.00")
+
+
+class SlugTests(TestCase):
+    def test_next_slug_continues_after_highest_suffix(self):
+        make_product(name="Phone")
+        make_product(name="Phone 9", slug="phone-9")
+        make_product(name="Phone 10", slug="phone-10")
+        make_product(name="Phone Case")  # phone-case is not a suffix
+        make_product(name="Phones")
+        self.assertEqual(Product.objects.next_slug("phone"), "phone-11")
+        self.assertEqual(Product.objects.next_slug("tablet"), "tablet")
+
+    def test_save_numbers_colliding_names(self):
+        slugs = [make_product(name=name).slug for name in ("Phone", "Phone!", "phone?")]
+        self.assertEqual(slugs, ["phone", "phone-1", "phone-2"])
+
+    def test_assign_slugs_numbers_against_database_and_batch(self):
+        make_product(name="Phone")
+        make_product(name="Laptop 3", slug="laptop-3")
+        products = [Product(name=name, description="Test", price=Decimal("1.00"))
+                    for name in ("Phone!", "Phone?", "Laptop", "Tablet")]
+        Product.objects.bulk_create(Product.objects.assign_slugs(products))
+        self.assertEqual([product.slug for product in products], ["phone-1", "phone-2", "laptop-4", "tablet"])
+
+    def test_long_names_leave_room_for_the_suffix(self):
+        max_length = Product._meta.get_field('slug').max_length
+        name = "Ultra " * 20
+        first = make_product(name=name)
+        second = make_product(name=name + "Pro")
+        self.assertEqual(second.slug, f"{first.slug}-1")
+        self.assertLessEqual(len(second.slug), max_length)
+        self.assertFalse(first.slug.endswith("-"))
+
+        batch = Product.objects.assign_slugs([Product(name=name + "Max", description="Test", price=Decimal("1.00"))])
+        self.assertEqual(batch[0].slug, f"{first.slug}-2")
+
+    def test_save_retries_when_a_concurrent_insert_takes_the_slug(self):
+        make_product(name="Phone")
+        real_next_slug = type(Product.objects).next_slug
+        picks = iter(["phone"])  # What a racing writer would have seen before the first insert
+
+        def next_slug(manager, base_slug):
+            return next(picks, None) or real_next_slug(manager, base_slug)
+
+        with mock.patch.object(type(Product.objects), 'next_slug', next_slug):
+            product = make_product(name="Phone!")
+        self.assertEqual(product.slug, "phone-1")
+
+    def test_save_gives_up_after_slug_attempts(self):
+        make_product(name="Phone")
+        with mock.patch.object(type(Product.objects), 'next_slug', return_value="phone") as next_slug:
+            product = Product(name="Phone!", description="Test", price=Decimal("1.00"))
+            with self.assertRaises(IntegrityError):
+                product.save()
+        self.assertEqual(next_slug.call_count, Product.SLUG_ATTEMPTS)
+        self.assertIsNone(product.slug)
+
+    def test_other_integrity_errors_are_not_retried(self):
+        make_product(name="Phone")
+        with mock.patch.object(type(Product.objects), 'next_slug', wraps=Product.objects.next_slug) as next_slug:
+            with self.assertRaises(IntegrityError):
+                make_product(name="Phone")  # Duplicate name, fresh slug
+        self.assertEqual(next_slug.call_count, 1)
+
+
+class SearchCatchUpTests(TestCase):
+    """Writes from other workers reach this process's index through ``catch_up``.
+
+    Inside a ``TestCase`` the signal handlers' ``on_commit`` callbacks never
+    run, so every write here looks like one made by another worker.
+    """
+
+    def setUp(self):
+        reset_index()
+        self.addCleanup(reset_index)
+        self.phone = make_product(name="Pixel Phone")
+        self.laptop = make_product(name="Zen Laptop")
+
+    def found(self, index, query):
+        return {product_id for product_id, _ in index.search(query)}
+
+    def test_catch_up_drops_deleted_products(self):
+        index = search.build_index()
+        self.phone.delete()
+        search.catch_up(index)
+        self.assertEqual(self.found(index, "pixel"), set())
+        self.assertEqual(index.product_ids(), {self.laptop.pk})
+
+    def test_ids_are_compared_only_after_a_delete(self):
+        index = search.build_index()
+        with self.assertNumQueries(2):  # Changed rows and the count
+            search.catch_up(index)
+        self.phone.delete()
+        with self.assertNumQueries(3):
+            search.catch_up(index)
+
+    def test_catch_up_indexes_new_and_changed_products(self):
+        index = search.build_index()
+        tablet = make_product(name="Tab Tablet")
+        self.laptop.name = "Zen Notebook"
+        self.laptop.save()
+        search.catch_up(index)
+        self.assertEqual(self.found(index, "tablet"), {tablet.pk})
+        self.assertEqual(self.found(index, "notebook"), {self.laptop.pk})
+        self.assertEqual(self.found(index, "laptop"), set())
+
+    def test_snapshot_forgets_products_deleted_after_it_was_written(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "search.pickle")
+            search.save_snapshot(search.build_index(), path)
+            self.phone.delete()
+            with override_settings(SEARCH_INDEX_PATH=path):
+                index = search.load_index()
+        self.assertEqual(self.found(index, "pixel"), set())
+        self.assertEqual(self.found(index, "zen"), {self.laptop.pk})
+
+
+class ReviewRatingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ann")
+        self.phone = make_product(name="Phone")
+        self.laptop = make_product(name="Laptop")
+
+    def assertRating(self, product, count, total):
+        stored = Product.objects.get(pk=product.pk)
+        self.assertEqual((stored.rating_count, stored.rating_sum), (count, total))
+        self.assertEqual((product.rating_count, product.rating_sum), (count, total))
+        self.assertEqual(product.average_rating, total / count if count else None)
+
+    def test_create_edit_and_delete_adjust_the_rating(self):
+        first = Review.objects.create(product=self.phone, user=self.user, rating=4)
+        second = Review.objects.create(product=self.phone, user=self.user, rating=5)
+        self.assertRating(self.phone, 2, 9)
+
+        first = Review.objects.get(pk=first.pk)
+        first.rating = 2
+        first.save()
+        self.assertRating(first.product, 2, 7)
+
+        first.product = self.laptop
+        first.save()
+        self.assertRating(self.laptop, 1, 2)
+        self.assertRating(Product.objects.get(pk=self.phone.pk), 1, 5)
+
+        second = Review.objects.get(pk=second.pk)
+        second.delete()
+        self.assertRating(second.product, 0, 0)
+
+    def test_partially_loaded_review_recounts(self):
+        review = Review.objects.create(product=self.phone, user=self.user, rating=4)
+        review = Review.objects.only('id', 'comment').get(pk=review.pk)
+        review.comment = "Edited"
+        review.save()
+        self.assertRating(review.product, 1, 4)
+
+    def test_partially_loaded_product_saves_only_its_loaded_fields(self):
+        product = Product.objects.only('id', 'stock').get(pk=self.phone.pk)
+        Product.objects.filter(pk=self.phone.pk).update(price=Decimal("99.00"))  # A concurrent change
+        product.stock = 3
+        with self.assertNumQueries(2):  # The UPDATE, and the category whose listing it retires
+            product.save()
+        self.assertEqual(Product.objects.values_list('stock', 'price').get(pk=self.phone.pk), (3, Decimal("99.00")))
+        self.assertGreater(Product.objects.get(pk=self.phone.pk).updated_at, self.phone.updated_at)
+
+    def test_product_saves_keep_the_rating(self):
+        stale = Product.objects.get(pk=self.phone.pk)  # Loaded before any review
+        Review.objects.create(product=self.phone, user=self.user, rating=4)
+        Review.objects.create(product=self.phone, user=self.user, rating=5)
+
+        self.phone.stock = 3
+        self.phone.save()
+        self.assertRating(self.phone, 2, 9)
+        self.assertEqual(Product.objects.get(pk=self.phone.pk).average_rating, 4.5)
+
+        stale.description = "Updated"
+        stale.save()
+        self.assertEqual(Product.objects.values_list('rating_count', 'rating_sum', 'average_rating', 'description')
+                         .get(pk=self.phone.pk), (2, 9, 4.5, "Updated"))
+
+
+@override_settings(PASSWORD_HASHER_ITERATIONS=1000)
+class LoginTokenTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user("ann", "ann@example.com", "secret-pass")
+
+    def login(self):
+        response = self.client.post("/api/auth/login/", {"identifier": "ann", "password": "secret-pass"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["token"]
+
+    def test_repeat_logins_read_the_key_from_the_cache(self):
+        first = self.login()
+        with self.assertNumQueries(0):
+            self.assertEqual(token_key_for(self.user), first)
+
+    def test_login_after_logout_gets_a_live_token(self):
+        first = self.login()
+        Token.objects.filter(user=self.user).delete()  # As logout_view does, in any process
+        second = self.login()
+        self.assertNotEqual(second, first)
+        self.assertTrue(Token.objects.filter(key=second, user=self.user).exists())
+
+
+class PasswordHasherTests(TestCase):
+    def test_lowered_work_factor_never_rehashes_downwards(self):
+        strong = make_password("secret-pass")
+        with override_settings(PASSWORD_HASHER_ITERATIONS=1000):
+            self.assertFalse(identify_hasher(strong).must_update(strong))
+            weak = make_password("secret-pass")
+            self.assertFalse(identify_hasher(weak).must_update(weak))
+        self.assertTrue(identify_hasher(weak).must_update(weak))
+
+    def test_login_at_a_lowered_work_factor_keeps_the_stored_hash(self):
+        user = User.objects.create_user("ann", password="secret-pass")
+        with override_settings(PASSWORD_HASHER_ITERATIONS=1000):
+            self.assertTrue(user.check_password("secret-pass"))
+        user.refresh_from_db()
+        self.assertFalse(identify_hasher(user.password).must_update(user.password))
+
+
+class TokenAuthenticationTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user("ann")
+        self.token = Token.objects.create(user=self.user)
+        self.url = f"/api/products/{make_product().pk}/reviews/"
+
+    def post_review(self):
+        return self.client.post(self.url, {"rating": 4}, content_type="application/json",
+                                HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_warm_tokens_authenticate_without_queries(self):
+        authentication = CachedTokenAuthentication()
+        self.assertEqual(authentication.authenticate_credentials(self.token.key)[0], self.user)
+        with self.assertNumQueries(0):
+            user, token = authentication.authenticate_credentials(self.token.key)
+        self.assertEqual((user, token), (self.user, self.token))
+
+    def test_revoked_token_is_rejected(self):
+        self.assertEqual(self.post_review().status_code, 201)
+        Token.objects.filter(user=self.user).delete()  # As logout_view does
+        self.assertEqual(self.post_review().status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.post_review().status_code, 201)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.post_review().status_code, 401)
+
+    def test_last_login_saves_keep_the_entry(self):
+        CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.user.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+
+    def test_unsignalled_revocations_apply_within_the_ttl(self):
+        self.assertEqual(self.post_review().status_code, 201)
+        with connection.cursor() as cursor:  # Raw SQL: no signal evicts the entry
+            cursor.execute(f"DELETE FROM {Token._meta.db_table} WHERE key = %s", [self.token.key])
+        self.assertEqual(self.post_review().status_code, 201)
+        caches['default'].clear()  # What the TTL does
+        self.assertEqual(self.post_review().status_code, 401)
+
+
+class LastSeenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ann")
+        self.buffer = LastSeenBuffer()
+
+    def test_flush_writes_buffered_timestamps_once(self):
+        with override_settings(LAST_SEEN_FLUSH_INTERVAL=3600):
+            self.buffer.record(self.user.pk)
+        self.assertIsNone(User.objects.get(pk=self.user.pk).last_seen)
+        self.buffer.flush()
+        self.assertIsNotNone(User.objects.get(pk=self.user.pk).last_seen)
+        with self.assertNumQueries(0):
+            self.buffer.flush()
+
+    def test_due_flush_runs_off_the_request_thread(self):
+        with override_settings(LAST_SEEN_FLUSH_INTERVAL=1), \
+                mock.patch('products.authentication._background') as background, \
+                mock.patch('products.authentication.time.monotonic', return_value=time.monotonic() + 5), \
+                self.assertNumQueries(0):
+            self.buffer.record(self.user.pk)
+            self.buffer.record(self.user.pk)
+        background.submit.assert_called_once_with(self.buffer._flush_in_background)
+
+    def test_failed_background_flush_is_logged(self):
+        with override_settings(LAST_SEEN_FLUSH_INTERVAL=3600):
+            self.buffer.record(self.user.pk)
+        with mock.patch.object(type(User.objects), 'mark_seen', side_effect=RuntimeError("down")), \
+                self.assertLogs('products.authentication', 'ERROR'):
+            # Its own thread: the flush closes that thread's connections when done
+            flusher = threading.Thread(target=self.buffer._flush_in_background)
+            flusher.start()
+            flusher.join()
+
+
+class MediaSendfileTests(TestCase):
+    def test_accel_redirect_path_is_url_quoted(self):
+        name = "covers/Phone #1 50%? é.png"
+        with tempfile.TemporaryDirectory() as media_root:
+            os.makedirs(os.path.join(media_root, "covers"))
+            with open(os.path.join(media_root, name), "wb") as f:
+                f.write(b"png")
+            options = {'SENDFILE_HEADER': 'X-Accel-Redirect', 'SENDFILE_PREFIX': '/protected-media/'}
+            with override_settings(MEDIA_ROOT=media_root, MEDIA_SERVING=options):
+                response = serve_media(RequestFactory().get("/media/"), name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], "/protected-media/covers/Phone%20%231%2050%25%3F%20%C3%A9.png")
+
+
+class CatalogETagTests(TestCase):
+    urls = ("/api/products/", "/api/products/{pk}/", "/api/products/category/phone/")
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        caches['default'].clear()
+        self.phone = make_product(name="Phone")
+        self.laptop = make_product(name="Laptop", category=Product.Category.LAPTOP)
+
+    def url(self, url):
+        return url.format(pk=self.phone.pk)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def assertNotModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_unchanged_catalog_is_not_modified_without_queries(self):
+        for url in map(self.url, self.urls):
+            with self.subTest(url=url):
+                etag = self.etag(url)
+                with self.assertNumQueries(0):
+                    self.assertNotModified(url, etag)
+
+    def test_query_parameters_get_their_own_tag(self):
+        self.assertNotEqual(self.etag("/api/products/"), self.etag("/api/products/?limit=1"))
+
+    def test_update_changes_the_tags(self):
+        before = {url: self.etag(url) for url in map(self.url, self.urls)}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.phone.price = Decimal("12.00")
+            self.phone.save()
+        for url, etag in before.items():
+            with self.subTest(url=url):
+                self.assertNotEqual(self.etag(url), etag)
+
+    def test_changed_product_is_never_served_stale_under_a_new_tag(self):
+        url = self.url("/api/products/{pk}/")
+        before = self.etag(url)  # Caches the body
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.phone.pk).update(price=Decimal("12.00"))
+            invalidate_product(self.phone.pk, [self.phone.category])  # As every write path does
+        response = self.client.get(url)
+        self.assertNotEqual(response["ETag"], before)
+        self.assertEqual(response.json()["price"], "12.00")
+
+    def test_create_and_delete_change_the_list_tag(self):
+        before = self.etag("/api/products/")
+        with self.captureOnCommitCallbacks(execute=True):
+            tablet = make_product(name="Tablet")
+        after_create = self.etag("/api/products/")
+        self.assertNotEqual(after_create, before)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tablet.delete()
+        self.assertNotEqual(self.etag("/api/products/"), after_create)
+
+    def test_imports_change_the_list_tag(self):
+        before = self.etag("/api/products/")
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            f.write('{"name": "Tablet", "description": "New", "price": "99.00"}\n')
+        self.addCleanup(os.remove, f.name)
+        call_command("import_products", f.name, stdout=io.StringIO())
+        self.assertNotEqual(self.etag("/api/products/"), before)
+
+    def test_other_categories_keep_their_tag(self):
+        etag = self.etag("/api/products/category/laptop/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.phone.save()
+        self.assertNotModified("/api/products/category/laptop/", etag)
+
+    def test_error_responses_are_not_tagged(self):
+        for url in ("/api/products/999999/", "/api/products/?limit=0", "/api/products/category/nothing/"):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn(response.status_code, (400, 404))
+                self.assertFalse(response.has_header("ETag"))
+
+    async def test_async_views_share_the_tags(self):  # ASGIURLConfMiddleware routes the async client there
+        url = f"/api/products/{self.phone.pk}/"
+        response = await self.async_client.get(url)
+        self.assertIs(response.resolver_match.func, async_views.get_product_by_id)
+        etag = response["ETag"]
+        self.assertEqual(etag, await sync_to_async(product_etag)(RequestFactory().get(url), self.phone.pk))
+        response = await self.async_client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        await sync_to_async(invalidate_product)(self.phone.pk)
+        self.assertEqual((await self.async_client.get(url, headers={"If-None-Match": etag})).status_code, 200)
+        self.assertFalse((await self.async_client.get("/api/products/999999/")).has_header("ETag"))
+
+
+class CompiledSerializerTests(TestCase):
+    """The fast paths must produce exactly what DRF would."""
+
+    def setUp(self):
+        variants = {'source': 'x', '200': {'width': 200, 'height': 150, 'webp': 'variants/ab/ab.webp', 'jpeg': 'variants/ab/ab.jpg'}}
+        self.phone = make_product(name="Phoné  “Pro”", price="999.99", discount=Decimal("12.50"),
+                                  image_variants=variants)
+        self.cable = make_product(name="Cable", price="0.10", category=Product.Category.ACCESSORY, image="")
+        user = User.objects.create_user("ann", "ann@example.com")
+        Review.objects.create(product=self.phone, user=user, rating=4)
+        Review.objects.create(product=self.phone, user=user, rating=5)
+        order = Order.objects.create(customer=user)
+        OrderItem.objects.create(order=order, product=self.phone, quantity=2)
+        OrderItem.objects.create(order=order, product=self.cable, quantity=3)
+        Order.objects.create(customer_name="Guest")
+
+    def assertSameAsDRF(self, queryset, serializer_class, fields=None, prepare=None):
+        rows = row_serializer(serializer_class, fields)
+        values = list(queryset.values(*rows.columns))
+        if prepare:
+            prepare(values)
+        kwargs = {} if fields is None else {'fields': fields}
+        self.assertEqual(rows.serialize(values), serializer_class(queryset, many=True, **kwargs).data)
+
+    def test_products(self):
+        self.assertSameAsDRF(Product.objects.order_by('id'), ProductSerializer)
+
+    def test_product_fields(self):
+        self.assertSameAsDRF(Product.objects.order_by('id'), ProductSerializer, ['id', 'name', 'discounted_price'])
+
+    def test_orders_with_items(self):
+        self.assertSameAsDRF(Order.objects.order_by('id').prefetch_related('order_items'), OrderSerializer,
+                             prepare=_attach_items)
+
+    def test_dumps_matches_json_renderer(self):
+        data = ProductSerializer(Product.objects.order_by('id'), many=True).data
+        data.append({"when": timezone.now(), "price": Decimal("1.50"), "nothing": None,
+                     "nested": {"ok": True}, "text": "line\u2028break"})
+        expected = JSONRenderer().render(data)
+        self.assertEqual(dumps(data), expected)
+        with mock.patch('products.renderers.orjson', None):  # The stdlib fallback
+            self.assertEqual(dumps(data), expected)
+
+
+class CatalogPageTests(TestCase):
+    def setUp(self):
+        self.products = [make_product(name=f"Product {i}", price=f"{i}.00") for i in range(5)]
+
+    def test_cursor_walks_every_product_once_in_order(self):
+        seen, url, pages = [], "/api/products/?limit=2", 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.json()), 2)
+            seen += [product["id"] for product in response.json()]
+            pages += 1
+            cursor = response.get("X-Next-Cursor")
+            if cursor:
+                self.assertIn(f"cursor={cursor}", response["Link"])
+            else:
+                self.assertFalse(response.has_header("Link"))
+            url = f"/api/products/?limit=2&cursor={cursor}" if cursor else None
+        self.assertEqual(seen, [product.pk for product in self.products])
+        self.assertEqual(pages, 3)
+
+    def test_default_page_is_bounded(self):
+        response = self.client.get("/api/products/")
+        self.assertEqual(len(response.json()), 5)
+        self.assertFalse(response.has_header("X-Next-Cursor"))
+
+    def test_fields_projects_the_rows(self):
+        response = self.client.get("/api/products/?fields=id,name&limit=1")
+        self.assertEqual(response.json(), [{"id": self.products[0].pk, "name": "Product 0"}])
+
+    def test_bad_parameters_are_rejected(self):
+        for query in ("fields=id,secret", "limit=0", "limit=many", "cursor=not-a-cursor"):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/products/?{query}").status_code, 400)
+
+
+class LocalLRUCacheTests(TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LocalLRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_entries_expire(self):
+        cache = LocalLRUCache(timeout=10)
+        cache.set("a", 1)
+        cache.set("b", 2, None)
+        with mock.patch('products.cache.time.monotonic', return_value=time.monotonic() + 11):
+            self.assertEqual((cache.get("a"), cache.get("b")), (None, 2))
+
+
+class CatalogCacheTests(TestCase):
+    """Read-through caching of product detail and category listings, retired by writes."""
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.phone = make_product(name="Phone")
+        self.user = User.objects.create_user("ann")
+
+    def detail(self):
+        return self.client.get(f"/api/products/{self.phone.pk}/")
+
+    def category_ids(self, category):
+        response = self.client.get(f"/api/products/category/{category}/")
+        return [product["id"] for product in response.json()] if response.status_code == 200 else []
+
+    def test_warm_reads_come_from_the_cache(self):
+        self.detail()
+        self.category_ids("phone")
+        Product.objects.filter(pk=self.phone.pk).update(price=Decimal("99.00"))  # No signal: invisible to the cache
+        self.assertEqual(self.detail().json()["price"], "10.00")
+        self.assertEqual(self.category_ids("phone"), [self.phone.pk])
+
+    def test_save_retires_detail_and_both_listings(self):
+        self.detail()
+        self.assertEqual(self.category_ids("phone"), [self.phone.pk])
+        self.assertEqual(self.category_ids("laptop"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.phone.price = Decimal("12.00")
+            self.phone.category = Product.Category.LAPTOP
+            self.phone.save()
+        self.assertEqual(self.detail().json()["price"], "12.00")
+        self.assertEqual(self.category_ids("phone"), [])
+        self.assertEqual(self.category_ids("laptop"), [self.phone.pk])
+
+    def test_delete_retires_the_entries(self):
+        self.detail()
+        self.category_ids("phone")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.phone.delete()
+        self.assertEqual(self.detail().status_code, 404)
+        self.assertEqual(self.category_ids("phone"), [])
+
+    def test_reviews_retire_the_entries(self):
+        self.detail()
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.phone, user=self.user, rating=4)
+        self.assertEqual(self.detail().json()["rating_count"], 1)
+
+    def test_load_that_lost_the_race_is_never_served(self):
+        key = product_key(self.phone.pk)  # A miss reads the version, then the row...
+        invalidate_product(self.phone.pk, [self.phone.category])  # ...a writer commits and bumps it...
+        get_catalog_cache().set(key, {"name": "stale"})  # ...and the old row lands under the retired key
+        self.assertEqual(self.detail().json()["name"], "Phone")
+
+
+class ImportProductsTests(TestCase):
+    def import_file(self, suffix, content, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False, encoding="utf-8") as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("import_products", f.name, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_inserts_new_and_updates_only_supplied_columns(self):
+        phone = make_product(name="Phone", stock=7, category=Product.Category.PHONE, is_featured=True)
+        self.import_file(".csv", "name,description,price,stock,category\n"
+                                 "Phone,Updated,20.00,,\n"  # Blank cells leave stock and category alone
+                                 "Tablet,New,30.00,4,tablet\n")
+        phone.refresh_from_db()
+        self.assertEqual((phone.description, phone.price, phone.stock, phone.category, phone.is_featured),
+                         ("Updated", Decimal("20.00"), 7, "phone", True))
+        self.assertEqual(phone.slug, "phone")
+        tablet = Product.objects.get(name="Tablet")
+        self.assertEqual((tablet.price, tablet.stock, tablet.category, tablet.slug),
+                         (Decimal("30.00"), 4, "tablet", "tablet"))
+
+    def test_last_row_for_a_name_wins(self):
+        self.import_file(".jsonl", '{"name": "Phone", "description": "First", "price": 1.1}\n'
+                                   '\n'
+                                   '{"name": "Phone", "description": "Second", "price": 2.2}\n', "--batch-size", "10")
+        self.assertEqual(list(Product.objects.values_list('description', 'price')), [("Second", Decimal("2.20"))])
+
+    def test_invalid_rows_are_reported_and_the_rest_written(self):
+        content = "name,description,price\nPhone,Fine,10.00\nBroken,,abc\n"
+        with self.assertRaisesMessage(CommandError, "1 invalid rows were skipped"):
+            self.import_file(".csv", content)
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ["Phone"])
+
+    def test_dry_run_writes_nothing(self):
+        stdout, _ = self.import_file(".csv", "name,description,price\nPhone,Fine,10.00\n", "--dry-run")
+        self.assertIn("Validated 1 products", stdout)
+        self.assertFalse(Product.objects.exists())
+
+    def test_updated_products_leave_the_cache(self):
+        phone = make_product(name="Phone")
+        key = product_key(phone.pk)
+        self.import_file(".csv", "name,description,price\nPhone,Updated,20.00\n")
+        self.assertNotEqual(product_key(phone.pk), key)
+
+
+class BackgroundSearchIndexTests(TransactionTestCase):
+    """The index is loaded and caught up on a background thread, never in the request."""
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        reset_index()
+        self.addCleanup(reset_index)
+        self.phone = Product.objects.create(name="Pixel Phone", description="Camera", price=Decimal("10.00"))
+
+    def search(self, query):
+        response = self.client.get("/api/products/search/", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return [product["id"] for product in response.json()]
+
+    def test_first_search_is_answered_while_the_index_loads(self):
+        with mock.patch.object(search, 'load_index', side_effect=search.load_index) as load_index:
+            self.assertEqual(self.search("pixel"), [self.phone.pk])  # Name match in the database
+            index = search.wait_for_index(timeout=10)
+        self.assertIsNotNone(index)
+        self.assertEqual(load_index.call_count, 1)
+        self.assertEqual(self.search("camera"), [self.phone.pk])  # Descriptions come from the index
+
+    def test_stale_index_catches_up_in_the_background(self):
+        self.search("pixel")
+        index = search.wait_for_index(timeout=10)
+        # No signals, as for a write in another process
+        tablet, = Product.objects.bulk_create([Product(name="Tab Tablet", description="Big", price=Decimal("5.00"))])
+        index.checked_at = 0
+        self.search("tablet")
+        search.wait_for_index(timeout=10)
+        self.assertEqual(self.search("tablet"), [tablet.pk])
+
+    def test_failed_load_is_logged_and_retried(self):
+        with mock.patch.object(search, 'load_index', side_effect=RuntimeError("down")), \
+                self.assertLogs('products.search', 'ERROR'):
+            self.assertEqual(self.search("pixel"), [self.phone.pk])
+            search.wait_for_index(timeout=10)
+        self.assertFalse(search.index_loaded())
+        self.search("pixel")
+        self.assertIsNotNone(search.wait_for_index(timeout=10))
+
+
+class FilterProductsTests(TestCase):
+    def setUp(self):
+        self.cheap_phone = make_product(name="Cheap Phone", price="50.00", stock=0)
+        self.phone = make_product(name="Phone", price="600.00", discount=Decimal("20"), is_featured=True)
+        self.laptop = make_product(name="Laptop", price="1500.00", category=Product.Category.LAPTOP)
+        self.tablet = make_product(name="Tablet", price="300.00", discount=Decimal("50"),
+                                   category=Product.Category.TABLET)
+
+    def filter(self, query=""):
+        response = self.client.get(f"/api/products/filter/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, query=""):
+        return [product["id"] for product in self.filter(query)["results"]]
+
+    def test_filters(self):
+        cases = {
+            "category=phone,laptop": [self.laptop, self.phone, self.cheap_phone],
+            "category=phone&category=tablet": [self.tablet, self.phone, self.cheap_phone],
+            "min_price=100&max_price=600": [self.tablet, self.phone],
+            "min_discount=20": [self.tablet, self.phone],
+            "featured=true": [self.phone],
+            "in_stock=1": [self.tablet, self.laptop, self.phone],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.ids(query), [product.pk for product in expected])
+
+    def test_sorts(self):
+        cases = {
+            "sort=price": [self.cheap_phone, self.tablet, self.phone, self.laptop],
+            "sort=-price": [self.laptop, self.phone, self.tablet, self.cheap_phone],
+            "sort=discounted_price": [self.cheap_phone, self.tablet, self.phone, self.laptop],  # 50, 150, 480, 1500
+            "sort=-discounted_price": [self.laptop, self.phone, self.tablet, self.cheap_phone],
+            "": [self.tablet, self.laptop, self.phone, self.cheap_phone],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.ids(query), [product.pk for product in expected])
+
+    def test_sorted_pages_follow_the_cursor(self):
+        first = self.filter("sort=-price&limit=3")
+        self.assertEqual(len(first["results"]), 3)
+        rest = self.filter(f"sort=-price&limit=3&cursor={first['next']}")
+        self.assertEqual([product["id"] for product in first["results"] + rest["results"]],
+                         [self.laptop.pk, self.phone.pk, self.tablet.pk, self.cheap_phone.pk])
+        self.assertIsNone(rest["next"])
+
+    def test_facets_ignore_their_own_selection(self):
+        facets = self.filter("category=phone&min_price=100")["facets"]
+        # Categories count within the price filter, price buckets within the category filter
+        self.assertEqual(facets["category"], {"phone": 1, "laptop": 1, "tablet": 1, "accessory": 0})
+        self.assertEqual([bucket["count"] for bucket in facets["price"]], [1, 0, 1, 0, 0])
+
+    def test_facets_follow_the_other_filters(self):
+        facets = self.filter("in_stock=1")["facets"]
+        self.assertEqual(facets["category"], {"phone": 1, "laptop": 1, "tablet": 1, "accessory": 0})
+
+    def test_bad_parameters_are_rejected(self):
+        for query in ("min_price=NaN", "max_price=Infinity", "min_discount=-inf", "min_price=cheap",
+                      "category=fridge", "sort=name"):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f"/api/products/filter/?{query}").status_code, 400)
+
+
+def png_bytes(size=(800, 400), mode='RGBA', color=(200, 30, 30, 128)):
+    buffer = io.BytesIO()
+    PILImage.new(mode, size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class ImageVariantTests(TestCase):
+    sizes = {'thumbnail': 160, 'detail': 1024}
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.settings_override = override_settings(
+            MEDIA_ROOT=media_root.name, PRODUCT_IMAGES={'VARIANTS': self.sizes, 'GENERATE_ON_SAVE': True},
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.pool.shutdown)
+
+    def product_with_image(self, name="Phone", data=None):
+        image = default_storage.save("products/cover.png", ContentFile(data or png_bytes()))
+        return make_product(name=name, image=image)
+
+    def test_render_keeps_the_aspect_ratio_and_never_upscales(self):
+        rendered = render_variants(png_bytes(), self.sizes)
+        self.assertEqual((rendered['thumbnail']['width'], rendered['thumbnail']['height']), (160, 80))
+        self.assertEqual((rendered['detail']['width'], rendered['detail']['height']), (800, 400))
+        for fmt, expected in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            with PILImage.open(io.BytesIO(rendered['thumbnail'][fmt])) as image:
+                self.assertEqual((image.format, image.mode, image.size), (expected, 'RGB', (160, 80)))
+
+    def test_generate_stores_and_records_the_variants(self):
+        product = self.product_with_image()
+        self.assertTrue(needs_variants(product))
+        self.assertEqual(generate_variants([product], self.pool), 1)
+
+        product.refresh_from_db()
+        variants = product.image_variants
+        self.assertEqual(variants['source'], product.image.name)
+        self.assertEqual(set(variants), {'source', 'thumbnail', 'detail'})
+        for fmt, extension in (('webp', '.webp'), ('jpeg', '.jpg')):
+            name = variants['thumbnail'][fmt]
+            self.assertTrue(name.startswith("variants/") and name.endswith(extension))
+            self.assertTrue(default_storage.exists(name))
+        self.assertFalse(needs_variants(product))
+
+    def test_identical_output_is_stored_once(self):
+        first = self.product_with_image("Phone")
+        second = self.product_with_image("Tablet")
+        self.assertNotEqual(first.image.name, second.image.name)
+        generate_variants([first, second], self.pool)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.image_variants['thumbnail'], second.image_variants['thumbnail'])
+
+    def test_missing_and_unreadable_images_are_skipped(self):
+        missing = make_product(name="Missing", image="products/missing.png")
+        broken = self.product_with_image("Broken", data=b"not an image")
+        with self.assertLogs('products.images', 'WARNING') as logs:
+            self.assertEqual(generate_variants([missing, broken], self.pool), 0)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(Product.objects.get(pk=missing.pk).image_variants, {})
+        self.assertEqual(Product.objects.get(pk=broken.pk).image_variants, {})
+
+    def test_image_replaced_meanwhile_is_left_alone(self):
+        product = self.product_with_image()
+        Product.objects.filter(pk=product.pk).update(image="products/replaced.png")
+        save_variants([product], {product.pk: {'source': product.image.name}})
+        self.assertEqual(Product.objects.get(pk=product.pk).image_variants, {})
+
+    def test_saves_schedule_variants_after_commit_and_only_for_new_images(self):
+        with mock.patch('products.images._background') as background:
+            with self.captureOnCommitCallbacks(execute=True):
+                product = self.product_with_image()
+            background.submit.assert_called_once_with(_generate_in_background, product.pk)
+
+            background.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                product.stock = 3
+                product.save(update_fields=['stock'])
+            background.submit.assert_not_called()
+
+    def test_background_generation_renders_in_the_pool(self):
+        product = self.product_with_image()
+        with mock.patch('products.images.process_pool', return_value=self.pool), \
+                mock.patch('products.images.connections'):  # Keep the test's connection open
+            _generate_in_background(product.pk)
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['source'], product.image.name)
+
+
+class CompressionMiddlewareTests(TestCase):
+    def middleware(self, response, codings=('gzip',)):
+        middleware = CompressionMiddleware(lambda request: response)
+        middleware.codings = codings  # Independent of whether brotli is installed
+        return middleware
+
+    def get(self, response, accept="gzip", method="get", **kwargs):
+        request = getattr(RequestFactory(), method)("/api/products/", HTTP_ACCEPT_ENCODING=accept)
+        return self.middleware(response, **kwargs)(request)
+
+    def json_response(self, size=4096):
+        return HttpResponse(json.dumps(["x" * 10] * (size // 15)), content_type="application/json")
+
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding("gzip;q=0.5, br , *;q=0, deflate;q=bad"),
+                         {'gzip': 0.5, 'br': 1.0, '*': 0.0, 'deflate': 0.0})
+
+    def test_negotiation_follows_q_values(self):
+        middleware = self.middleware(None, codings=('br', 'gzip'))
+        for header, expected in [
+            ("gzip, br", 'br'),                # Server preference on ties
+            ("gzip;q=1.0, br;q=0.5", 'gzip'),
+            ("br;q=0, gzip;q=0.1", 'gzip'),
+            ("*", 'br'),
+            ("*;q=0.5, br;q=0", 'gzip'),
+            ("identity", None),
+            ("gzip;q=0, br;q=0", None),
+            ("", None),
+        ]:
+            with self.subTest(header=header):
+                self.assertEqual(middleware.negotiate(header), expected)
+
+    def test_large_bodies_are_compressed(self):
+        original = self.json_response()
+        content = original.content
+        response = self.get(original)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), content)
+
+    def test_small_bodies_are_sent_as_is(self):
+        with override_settings(RESPONSE_COMPRESSION={'MIN_SIZE': 10000}):
+            response = self.get(self.json_response(4096))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_unwanted_or_unsafe_responses_are_skipped(self):
+        html = HttpResponse("<p>" * 2000, content_type="text/html")
+        not_found = self.json_response()
+        not_found.status_code = 404
+        for name, response in [("post", self.get(self.json_response(), method="post")),
+                               ("html", self.get(html)),
+                               ("error", self.get(not_found)),
+                               ("identity", self.get(self.json_response(), accept="identity"))]:
+            with self.subTest(name):
+                self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_strong_etags_are_weakened(self):
+        original = self.json_response()
+        original["ETag"] = '"abc"'
+        self.assertEqual(self.get(original)["ETag"], 'W/"abc"')
+
+    def test_iter_json_array_skips_empty_batches(self):
+        self.assertEqual(b"".join(iter_json_array([])), b"[]")
+        chunks = list(iter_json_array([[], [{"a": 1}, {"b": 2}], [], [{"c": 3}]]))
+        self.assertEqual(json.loads(b"".join(chunks)), [{"a": 1}, {"b": 2}, {"c": 3}])
+
+    def test_streamed_export_decodes_to_the_catalog(self):
+        names = {make_product(name=f"Product {i}").name for i in range(5)}
+        with mock.patch("products.views.EXPORT_BATCH_SIZE", 2):
+            response = self.client.get("/api/products/export/?fields=id,name", HTTP_ACCEPT_ENCODING="gzip")
+            self.assertTrue(response.streaming)
+            chunks = list(response.streaming_content)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertGreater(len(chunks), 2)  # Flushed batch by batch
+        rows = json.loads(gzip.decompress(b"".join(chunks)))
+        self.assertEqual({row["name"] for row in rows}, names)
+        self.assertEqual(set(rows[0]), {"id", "name"})
+
+    async def test_async_streamed_export_decodes_to_the_catalog(self):
+        await sync_to_async(make_product)(name="Phone")
+        await sync_to_async(make_product)(name="Laptop")
+        response = await self.async_client.get("/api/products/export/", headers={"Accept-Encoding": "gzip"})
+        self.assertTrue(response.is_async)
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual([row["name"] for row in json.loads(gzip.decompress(body))], ["Phone", "Laptop"])
 
-# Create your tests here.
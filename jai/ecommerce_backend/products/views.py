@@ -1,23 +1,36 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.authtoken.models import Token
+from rest_framework.utils.urls import replace_query_param
 import logging
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
 import json
 from .models import Order, OrderItem 
-from decimal import Decimal
 
 from products.utils import get_product_by_id
 
 
 
-from .models import Product, Order
-from .serializers import ProductSerializer, UserSerializer, OrderSerializer
+from .models import Product, Order, Review
+from .serializers import ProductSerializer, ReviewSerializer, UserSerializer, OrderSerializer, OrderItemSerializer
+from .pagination import keyset_paginate, parse_fields, parse_limit
+from .cache import category_key, get_catalog_cache, get_or_set, order_count_key, product_key
+from .search import get_index, search_database
+from .filters import CatalogFilter
+from .managers import InsufficientStock
+from .backends import token_key_for
+from .metrics import registry
+from .etags import category_etag, condition, product_etag, products_etag
+from .compiled import row_serializer
+from .renderers import streaming_json_response
 
 User = get_user_model()
 
@@ -28,23 +41,156 @@ def is_admin(user):
 
 
 # ✅ Fetch product by ID
+@condition(product_etag)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_product_by_id(request, product_id):
-    """Fetch a single product by its ID."""
-    product = get_object_or_404(Product, id=product_id)
-    serializer = ProductSerializer(product)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    """Fetch a single product by its ID (served from the catalog cache when warm)."""
+    def load():
+        product = get_object_or_404(Product, id=product_id)
+        return dict(ProductSerializer(product).data)
+
+    return Response(get_or_set(product_key(product_id), load), status=status.HTTP_200_OK)
+
+
+# Catalog pages are walked in insertion order; `id` breaks ties between equal timestamps.
+CATALOG_ORDERING = ('created_at', 'id')
 
 
-# ✅ Fetch all products
+# ✅ Fetch all products (keyset paginated)
+@condition(products_etag)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_products(request):
-    """Fetch all products."""
-    products = Product.objects.all()
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    """Fetch one page of products, optionally projected to a subset of fields.
+
+    Query params: ``limit`` (default 50), ``cursor`` (from the ``X-Next-Cursor``
+    header of the previous page) and ``fields`` (comma separated).
+    """
+    try:
+        fields = parse_fields(request.query_params.get("fields"), ProductSerializer.Meta.fields)
+        limit = parse_limit(request.query_params.get("limit"))
+        rows = row_serializer(ProductSerializer, fields)
+        products = Product.objects.values(*{*rows.columns, *CATALOG_ORDERING})
+        page, next_cursor = keyset_paginate(products, CATALOG_ORDERING, request.query_params.get("cursor"), limit)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = Response(rows.serialize(page), status=status.HTTP_200_OK)
+    if next_cursor:
+        next_url = replace_query_param(request.build_absolute_uri(), "cursor", next_cursor)
+        response["Link"] = f'<{next_url}>; rel="next"'
+        response["X-Next-Cursor"] = next_cursor
+    return response
+
+
+def _cached_products(product_ids):
+    """Serialized products in the given order, from the catalog cache plus one query for misses."""
+    cache = get_catalog_cache()
+    keys = {product_id: product_key(product_id) for product_id in product_ids}  # Versions read before the rows
+    found, missing = {}, []
+    for product_id, key in keys.items():
+        data = cache.get(key)
+        if data is None:
+            missing.append(product_id)
+        else:
+            found[product_id] = data
+    if missing:
+        for product in Product.objects.filter(id__in=missing):
+            found[product.id] = dict(ProductSerializer(product).data)
+            cache.set(keys[product.id], found[product.id])
+    return [found[product_id] for product_id in product_ids if product_id in found]
+
+
+# ✅ Filter products with facet counts
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def filter_products(request):
+    """Filter and sort the catalog, returning one page plus facet counts.
+
+    Query params: ``category`` (repeatable or comma separated), ``min_price``,
+    ``max_price``, ``min_discount``, ``featured``, ``in_stock``, ``sort``
+    (newest, price, -price, discounted_price, -discounted_price), ``fields``,
+    ``limit`` and ``cursor``. Costs two queries: the page and one aggregate.
+    """
+    try:
+        catalog_filter = CatalogFilter(request.query_params)
+        fields = parse_fields(request.query_params.get("fields"), ProductSerializer.Meta.fields)
+        limit = parse_limit(request.query_params.get("limit"))
+        ordering = catalog_filter.ordering
+        rows = row_serializer(ProductSerializer, fields)
+        products = catalog_filter.queryset().values(*{*rows.columns, *(name.lstrip('-') for name in ordering)})
+        page, next_cursor = keyset_paginate(products, ordering, request.query_params.get("cursor"), limit)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        "results": rows.serialize(page),
+        "facets": catalog_filter.facet_counts(),
+        "next": next_cursor,
+    }, status=status.HTTP_200_OK)
+
+
+# ✅ Search products
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def search_products(request):
+    """Full-text search over product names and descriptions, best matches first.
+
+    Query params: ``q`` (the last word also matches as a prefix) and ``limit``
+    (default 20, max 100). While a new process is still loading its index,
+    product names are matched in the database instead.
+    """
+    query = request.query_params.get("q", "").strip()
+    if not query:
+        return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = parse_limit(request.query_params.get("limit"), default=20, maximum=100)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    index = get_index()
+    hits = index.search(query, limit) if index is not None else search_database(query, limit)  # Still loading
+    return Response(_cached_products([product_id for product_id, _ in hits]), status=status.HTTP_200_OK)
+
+
+# Reviews are listed newest first; `id` breaks ties between equal timestamps.
+REVIEW_ORDERING = ('-created_at', '-id')
+
+
+# ✅ Product reviews (keyset paginated)
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticatedOrReadOnly])
+def product_reviews(request, product_id):
+    """List a product's reviews, newest first, or add one (authenticated).
+
+    Query params: ``limit`` and ``cursor`` (the ``next`` value of the previous
+    page). Rating totals live on the product, so listings never aggregate reviews.
+    """
+    product = get_object_or_404(Product.objects.only('id', 'category'), id=product_id)
+
+    if request.method == "POST":
+        serializer = ReviewSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        serializer.save(product=product, user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    try:
+        limit = parse_limit(request.query_params.get("limit"))
+        reviews = (
+            Review.objects.filter(product=product)
+            .select_related('user')
+            .only('id', 'rating', 'comment', 'created_at', 'user__username')
+        )
+        page, next_cursor = keyset_paginate(reviews, REVIEW_ORDERING, request.query_params.get("cursor"), limit)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        "reviews": ReviewSerializer(page, many=True).data,
+        "next": next_cursor,
+    }, status=status.HTTP_200_OK)
 
 
 # ✅ API Root
@@ -53,6 +199,10 @@ def api_root(request):
     """API root endpoint with available routes."""
     return Response({
         "products": "/api/products/",
+        "export_products": "/api/products/export/",
+        "search": "/api/products/search/?q=<query>",
+        "filter_products": "/api/products/filter/",
+        "product_reviews": "/api/products/<id>/reviews/",
         "products_by_category": "/api/products/category/<category_name>/",
         "register": "/api/auth/register/",
         "login": "/api/auth/login/",
@@ -60,21 +210,33 @@ def api_root(request):
         "add_product": "/api/admin/products/add/",
         "update_product": "/api/admin/products/update/<product_id>/",
         "delete_product": "/api/admin/products/delete/<product_id>/",
+        "metrics": "/api/admin/metrics/",
         "orders": "/api/admin/orders/",
+        "export_orders": "/api/admin/orders/export/",
         "update_order_status": "/api/admin/orders/update/<order_id>/"
     }, status=status.HTTP_200_OK)
 
 
 # ✅ Fetch products by category
+@condition(category_etag)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_products_by_category(request, category):
-    """Fetch products by category."""
-    products = Product.objects.filter(category=category)
-    if not products.exists():
+    """Fetch products by category (served from the catalog cache when warm).
+
+    A miss costs a single query; see ``filter_products`` for richer filtering.
+    """
+    if category not in Product.Category.values:
         return Response({"error": "No products found in this category"}, status=status.HTTP_404_NOT_FOUND)
-    serializer = ProductSerializer(products, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+
+    def load():
+        rows = row_serializer(ProductSerializer)
+        return rows.serialize(Product.objects.filter(category=category).order_by(*CATALOG_ORDERING).values(*rows.columns))
+
+    data = get_or_set(category_key(category), load)
+    if not data:
+        return Response({"error": "No products found in this category"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(data, status=status.HTTP_200_OK)
 
 
 # ✅ Update Order Status
@@ -86,7 +248,7 @@ def update_order_status(request, order_id):
     if new_status not in ["Pending", "Shipped", "Delivered"]:
         return Response({"error": "Invalid status"}, status=status.HTTP_400_BAD_REQUEST)
     order.status = new_status
-    order.save()
+    order.save(update_fields=['status', 'updated_at'])
     return Response({"message": "Order status updated successfully"}, status=status.HTTP_200_OK)
 
 
@@ -139,19 +301,13 @@ def login_view(request):
     if not identifier or not password:
         return Response({"error": "Username/Email and Password are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-    user = authenticate(username=identifier, password=password)
-
+    # One query resolves username or email; the password is hashed once
+    user = authenticate(request, username=identifier, password=password)
     if user is None:
-        try:
-            user = User.objects.get(email=identifier)
-            if not user.check_password(password):
-                return Response({"error": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
-        except User.DoesNotExist:
-            return Response({"error": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"error": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
 
     login(request, user)
-    token, _ = Token.objects.get_or_create(user=user)
-    return Response({"message": "Login successful", "token": token.key, "user": UserSerializer(user).data}, status=status.HTTP_200_OK)
+    return Response({"message": "Login successful", "token": token_key_for(user), "user": UserSerializer(user).data}, status=status.HTTP_200_OK)
 
 
 # ✅ User Logout
@@ -159,7 +315,8 @@ def login_view(request):
 @permission_classes([AllowAny])
 def logout_view(request):
     """Logout the current user."""
-    Token.objects.filter(user=request.user).delete()
+    if request.user.is_authenticated:
+        Token.objects.filter(user=request.user).delete()
     logout(request)
     return Response({"message": "Logout successful"}, status=status.HTTP_200_OK)
 
@@ -172,12 +329,11 @@ def admin_login(request):
     username = request.data.get("username")
     password = request.data.get("password")
 
-    user = authenticate(username=username, password=password)
+    user = authenticate(request, username=username, password=password)
 
     if user and is_admin(user):
         login(request, user)
-        token, _ = Token.objects.get_or_create(user=user)
-        return Response({"token": token.key, "message": "Admin login successful"}, status=status.HTTP_200_OK)
+        return Response({"token": token_key_for(user), "message": "Admin login successful"}, status=status.HTTP_200_OK)
 
     return Response({"error": "Invalid credentials or not an admin"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -244,36 +400,30 @@ def create_order(request):
         
         address = data.get('customer_address', '')  # Get address from request data
 
-        # Create order with all fields including address
-        order = Order.objects.create(
-            status="Pending", 
-            total_price=0,
-            customer=user,
-            customer_name=data.get('customer_name', user.get_full_name() if user else 'Guest'),
-            customer_email=email,
-            customer_address=address  # Add address to order creation
-        )
-        logger.info(f"🛒 Created Order ID: {order.id} | Email: {email} | Address: {address[:50]}...")
+        try:
+            items = [(int(item["id"]), int(item["quantity"])) for item in data["items"]]
+        except (KeyError, TypeError, ValueError):
+            return JsonResponse({"error": "Each item needs a numeric id and quantity."}, status=400)
+        if any(quantity < 1 for _, quantity in items):
+            return JsonResponse({"error": "Item quantities must be at least 1."}, status=400)
 
-        total_price = Decimal(0)
-        
-        for item in data["items"]:
-            product = get_object_or_404(Product, id=item["id"])
-            quantity = int(item["quantity"])
-            price = product.discounted_price
-
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                product_name=product.name,
-                quantity=quantity,
-                price=price,
+        # Create the order and all its items in one transaction (constant query count)
+        try:
+            order = Order.objects.create_with_items(
+                items,
+                status="Pending",
+                customer=user,
+                customer_name=data.get('customer_name', user.get_full_name() if user else 'Guest'),
+                customer_email=email,
+                customer_address=address,
             )
-            total_price += price * quantity
+        except Product.DoesNotExist as e:
+            return JsonResponse({"error": str(e)}, status=404)
+        except InsufficientStock as e:
+            return JsonResponse({"error": str(e), "product_ids": e.product_ids}, status=400)
+
+        logger.info(f"🛒 Created Order ID: {order.id} | Email: {email} | Address: {address[:50]}...")
 
-        order.total_price = total_price
-        order.save()
-        
         logger.info(f"✅ Order {order.id} complete. Email: {order.customer_email}")
         return JsonResponse({
             "message": "Order placed successfully!",
@@ -287,12 +437,130 @@ def create_order(request):
         traceback.print_exc()
         return JsonResponse({"error": str(e)}, status=500)
 
+# Newest orders first; `id` breaks ties between equal timestamps.
+ORDER_FEED_ORDERING = ('-created_at', '-id')
+ORDER_COUNT_TIMEOUT = 30  # Seconds a cached order count may lag behind
+
+
+def _parse_timestamp(value, name):
+    """Parse an ISO date or datetime query parameter into an aware datetime."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"{name} must be an ISO date or datetime")
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _order_filters(params):
+    """Build ORM filters from the order feed query parameters."""
+    filters = {}
+    if params.get("status"):
+        if params["status"] not in Order.OrderStatus.values:
+            raise ValueError("Invalid status")
+        filters["status"] = params["status"]
+    if params.get("payment_status"):
+        if params["payment_status"] not in Order.PaymentStatus.values:
+            raise ValueError("Invalid payment_status")
+        filters["payment_status"] = params["payment_status"]
+    if params.get("created_after"):
+        filters["created_at__gte"] = _parse_timestamp(params["created_after"], "created_after")
+    if params.get("created_before"):
+        filters["created_at__lt"] = _parse_timestamp(params["created_before"], "created_before")
+    return filters
+
+
+def _attach_items(orders):
+    """Add ``order_items`` rows to order rows, fetching them all in one query as prefetch_related would."""
+    items = {}
+    item_rows = OrderItem.objects.filter(order_id__in=[order['id'] for order in orders])
+    for item in item_rows.values('order_id', *row_serializer(OrderItemSerializer).columns):
+        items.setdefault(item['order_id'], []).append(item)
+    for order in orders:
+        order['order_items'] = items.get(order['id'], [])
+
+
+# ✅ Fetch orders (keyset paginated, with items)
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_orders(request):
-    orders = Order.objects.all().order_by("-created_at").prefetch_related('order_items')
-    serializer = OrderSerializer(orders, many=True)
+    """Fetch one page of orders, newest first, with their items.
+
+    Query params: ``status``, ``payment_status``, ``created_after`` /
+    ``created_before`` (ISO date or datetime), ``limit`` and ``cursor``
+    (the ``next`` value of the previous page). ``count`` is cached briefly.
+    """
+    try:
+        filters = _order_filters(request.query_params)
+        limit = parse_limit(request.query_params.get("limit"))
+        rows = row_serializer(OrderSerializer)
+        orders = Order.objects.filter(**filters).values(*rows.columns)
+        page, next_cursor = keyset_paginate(orders, ORDER_FEED_ORDERING, request.query_params.get("cursor"), limit)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    _attach_items(page)
+    count = get_or_set(
+        order_count_key(filters), lambda: Order.objects.filter(**filters).count(), timeout=ORDER_COUNT_TIMEOUT
+    )
     return Response({
-        "orders": serializer.data,
-        "count": orders.count()
-    })
\ No newline at end of file
+        "orders": rows.serialize(page),
+        "count": count,
+        "next": next_cursor,
+    })
+
+
+# Rows per query when streaming an export; memory use is bounded by this, not the table size
+EXPORT_BATCH_SIZE = 1000
+
+
+def _export_batches(queryset, rows, prepare=None):
+    """Serialized batches of ``queryset`` in id order, walked with keyset queries rather than
+    ``.iterator()``, which MySQL's client library would buffer whole."""
+    queryset = queryset.order_by('id').values(*{*rows.columns, 'id'})
+    last_id = 0
+    while batch := list(queryset.filter(id__gt=last_id)[:EXPORT_BATCH_SIZE]):
+        last_id = batch[-1]['id']
+        if prepare:
+            prepare(batch)
+        yield rows.serialize(batch)
+
+
+# ✅ Export the whole catalog (streamed JSON array)
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def export_products(request):
+    """Stream every product, in id order, as one JSON array.
+
+    Query params: ``fields`` (comma separated). Responses are compressed by
+    ``CompressionMiddleware`` when the client accepts it.
+    """
+    try:
+        fields = parse_fields(request.query_params.get("fields"), ProductSerializer.Meta.fields)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return streaming_json_response(_export_batches(Product.objects.all(), row_serializer(ProductSerializer, fields)), request)
+
+
+# ✅ Export orders with items (streamed JSON array)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def export_orders(request):
+    """Stream every order matching the ``get_orders`` filters, in id order, with its items."""
+    try:
+        filters = _order_filters(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    batches = _export_batches(Order.objects.filter(**filters), row_serializer(OrderSerializer), prepare=_attach_items)
+    return streaming_json_response(batches, request)
+
+
+# ✅ Performance metrics (Prometheus text format)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    """Per-route latency, query and serializer metrics recorded by PerformanceMiddleware (this process only)."""
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")